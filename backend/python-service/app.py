@@ -1,11 +1,24 @@
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
 import sys
 from pathlib import Path
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps, UnidentifiedImageError
 import io
+import time
+import json
+import hashlib
+import queue
+import random
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import Registry, instrument_app
+import logs
 
 # Import YOLOv8
 try:
@@ -14,168 +27,1502 @@ except ImportError:
     print("Error: ultralytics not installed. Run: pip install ultralytics")
     sys.exit(1)
 
+logger = logs.get_logger('yolo')
+
+
+class InMemoryRequest(Request):
+    """
+    Keep uploaded files in memory instead of spooling them to disk.
+    The body size limit is enforced while the body is streamed in, so an
+    oversized upload is rejected before it is buffered.
+    Batch and stream bodies can be far larger than one image, so their image
+    parts above BATCH_SPOOL_BYTES are spooled to disk and read back one at a
+    time. Videos go straight to a named temporary file that OpenCV can open;
+    it is deleted when the stream is closed.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        if self.path == '/predict/batch':
+            return tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_BYTES, mode='rb+')
+        if self.path == '/predict/stream':
+            extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+            if extension in VIDEO_EXTENSIONS:
+                return tempfile.NamedTemporaryFile(suffix=f'.{extension}')
+            return tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_BYTES, mode='rb+')
+        return io.BytesIO()
+
+    @property
+    def max_content_length(self):
+        if self.path == '/predict/batch':
+            return MAX_BATCH_UPLOAD_BYTES
+        if self.path == '/predict/stream':
+            return MAX_STREAM_UPLOAD_BYTES
+        return MAX_UPLOAD_BYTES
+
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+
+# Prometheus metrics, served at /metrics
+metrics_registry = Registry()
+instrument_app(app, metrics_registry, 'bloomiq_yolo')
+STAGE_SECONDS = metrics_registry.histogram('bloomiq_yolo_stage_seconds', 'Time spent per request stage')
+MODEL_RELOADS_TOTAL = metrics_registry.counter('bloomiq_yolo_model_reloads_total', 'Hot reloads of the model weights by result')
+MODEL_IMAGES_TOTAL = metrics_registry.counter('bloomiq_yolo_model_images_total', 'Images analyzed per model version')
 
 # Configuration
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-UPLOAD_FOLDER = './temp_uploads'
 MODEL_DIR = '../models'
+CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', 0.25))
+
+# Upload limits and server-side resize
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', 15)) * 1024 * 1024  # per image / per /predict body
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv('MAX_BATCH_UPLOAD_MB', 512)) * 1024 * 1024  # whole /predict/batch body
+BATCH_SPOOL_BYTES = int(os.getenv('BATCH_SPOOL_KB', 256)) * 1024  # batch and stream frame parts above this are spooled to disk
+
+# Inference backend: 'pytorch' serves the .pt weights directly, 'onnx' and
+# 'openvino' export them once and serve the cached artifact on CPU
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'pytorch').lower()
+INFERENCE_IMGSZ = int(os.getenv('INFERENCE_IMGSZ', 640))  # export input size
+MAX_INPUT_SIDE = int(os.getenv('MAX_INPUT_SIDE', INFERENCE_IMGSZ))  # downscale long edge before inference, 0 = off
+EXPORT_SUFFIXES = {'onnx': '.onnx', 'openvino': '_openvino_model'}
+
+# INT8 quantization of the ONNX artifact with ONNX Runtime: 'dynamic' needs no
+# data, 'static' calibrates activation ranges on images in QUANT_CALIBRATION_DIR
+MODEL_QUANTIZATION = os.getenv('MODEL_QUANTIZATION', 'none').lower()  # none, dynamic or static
+QUANT_CALIBRATION_DIR = os.getenv('QUANT_CALIBRATION_DIR', '../models/calibration')
+QUANT_CALIBRATION_IMAGES = int(os.getenv('QUANT_CALIBRATION_IMAGES', 200))
+QUANT_CALIBRATE_METHOD = os.getenv('QUANT_CALIBRATE_METHOD', 'minmax').lower()  # minmax, entropy or percentile
+
+# Hot reload: poll the weights and swap in a new version without a restart.
+# MODEL_TRAFFIC_SPLIT weighs the loaded versions for A/B tests, newest first
+MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 10))  # seconds between checks, 0 = off
+MODEL_VERSIONS_KEPT = int(os.getenv('MODEL_VERSIONS_KEPT', 1))  # versions kept loaded, the newest included
+MODEL_TRAFFIC_SPLIT = [float(weight) for weight in os.getenv('MODEL_TRAFFIC_SPLIT', '').split(',') if weight.strip()]
+
+# Early-exit cascade: run the likelier model first and skip the other when its
+# top confidence clears the margin. CASCADE_FIRST_MODEL is flower, fruit or auto
+CASCADE_MODE = os.getenv('CASCADE_MODE', 'false').lower() == 'true'
+CASCADE_FIRST_MODEL = os.getenv('CASCADE_FIRST_MODEL', 'flower').lower()
+CASCADE_MARGIN = float(os.getenv('CASCADE_MARGIN', 0.8))
+
+# Warmup: dummy inferences at these sizes before the service reports ready
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+WARMUP_IMGSZ = [int(size) for size in os.getenv('WARMUP_IMGSZ', '640').split(',') if size.strip()]
+WARMUP_RUNS = int(os.getenv('WARMUP_RUNS', 2))
+
+# Batch inference
+MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', 200))  # images per /predict/batch request
+PREDICT_BATCH_SIZE = int(os.getenv('PREDICT_BATCH_SIZE', 16))  # images per forward pass
+
+# Tiled inference for high-resolution imagery (TILED_MODE or ?tiled=true)
+TILED_MODE = os.getenv('TILED_MODE', 'false').lower() == 'true'
+TILE_SIZE = int(os.getenv('TILE_SIZE', INFERENCE_IMGSZ))  # px, square tiles
+TILE_OVERLAP = float(os.getenv('TILE_OVERLAP', 0.2))  # fraction of TILE_SIZE shared by neighbours
+TILE_MAX_SIDE = int(os.getenv('TILE_MAX_SIDE', 4096))  # decode cap in tiled mode, bounds the tile count
+TILE_BATCH_SIZE = int(os.getenv('TILE_BATCH_SIZE', PREDICT_BATCH_SIZE))  # tiles per forward pass
+TILE_INCLUDE_FULL = os.getenv('TILE_INCLUDE_FULL', 'true').lower() == 'true'  # also run the whole image, for large objects
+TILE_MERGE_THRESHOLD = float(os.getenv('TILE_MERGE_THRESHOLD', 0.5))  # intersection over smaller box
+
+# Video / frame-stream analysis (/predict/stream)
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
+MAX_STREAM_UPLOAD_BYTES = int(os.getenv('MAX_STREAM_UPLOAD_MB', 256)) * 1024 * 1024  # whole /predict/stream body
+STREAM_SAMPLE_FPS = float(os.getenv('STREAM_SAMPLE_FPS', 2))  # video frames analyzed per second of footage
+STREAM_MAX_FRAMES = int(os.getenv('STREAM_MAX_FRAMES', 300))  # sampled frames per request
+STREAM_DEDUPE_DISTANCE = int(os.getenv('STREAM_DEDUPE_DISTANCE', 5))  # dHash bits (of 64); -1 disables
+
+# Micro-batching of concurrent /predict requests
+MICRO_BATCHING = os.getenv('MICRO_BATCHING', 'false').lower() == 'true'
+MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 8))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 10))
+
+# Model execution: 'sequential' runs flower then fruit, 'parallel' runs both at once
+MODEL_EXECUTION = os.getenv('MODEL_EXECUTION', 'sequential').lower()
+MODEL_EXECUTOR_WORKERS = int(os.getenv('MODEL_EXECUTOR_WORKERS', 4))
+TORCH_THREADS = int(os.getenv('TORCH_THREADS', 0))  # 0 = split cores automatically
+SERVING_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))  # prefork workers sharing this host
+
+# Result cache keyed on image bytes, confidence threshold and loaded model files
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 1024))  # 0 disables the cache
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_MB', 64)) * 1024 * 1024
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 3600))  # seconds
 
 # Ensure directories exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
 
 # Model paths
 FLOWER_MODEL_PATH = os.path.join(MODEL_DIR, 'flower_model.pt')
 FRUIT_MODEL_PATH = os.path.join(MODEL_DIR, 'fruit_model.pt')
 
-# Load models (will be loaded on first request if not available)
+# Load models (will be loaded on first request if not available).
+# flower_model, fruit_model, model_fingerprint and model_artifacts mirror the
+# newest version in model_versions
 flower_model = None
 fruit_model = None
+model_fingerprint = None
+model_artifacts = {}
+model_versions = []  # loaded ModelVersions, newest first
+models_ready = False
+model_watcher = None
+reload_stats = {'checks': 0, 'reloads': 0, 'failures': 0, 'last_error': None}
+cascade_stats = {'images': 0, 'short_circuited': 0, 'flower': 0, 'fruit': 0}
+cascade_lock = threading.Lock()
+model_load_lock = threading.RLock()
+model_executor = None
 
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def load_models():
-    """Load YOLOv8 models"""
-    global flower_model, fruit_model
+def upload_size(stream):
+    """Size of an uploaded file, whether it is held in memory or spooled to disk"""
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def upload_buffer(stream):
+    """An uploaded file as a BytesIO; a part spooled to disk is read back into memory"""
+    if isinstance(stream, io.BytesIO):
+        return stream
+    stream.seek(0)
+    return io.BytesIO(stream.read())
+
+
+def decode_image(stream, max_side=None):
+    """
+    Decode an uploaded image once into a numpy array shared by both models.
+    Images whose long edge exceeds `max_side` (MAX_INPUT_SIDE by default) are
+    downscaled to the model input size first; JPEGs are reduced while
+    decoding via draft mode, so a 48MP photo is never fully decoded.
+    The image is decoded as RGB and handed over in BGR channel order, which
+    is what Ultralytics expects for ndarray sources.
+    Returns the array and a dict describing the preprocessing.
+    """
+    max_side = MAX_INPUT_SIDE if max_side is None else max_side
     
+    with STAGE_SECONDS.time(stage='decode'):
+        with Image.open(stream) as img:
+            original_long_side = max(img.size)
+            if max_side and original_long_side > max_side:
+                img.draft('RGB', (max_side, max_side))
+            img = ImageOps.exif_transpose(img)
+        
+        original_size = list(img.size) if max(img.size) == original_long_side else None
+        if max_side and max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.BILINEAR)
+        
+        rgb = np.asarray(img.convert('RGB'))
+        scale = max(img.size) / original_long_side
+        info = {
+            'original_size': original_size or [round(v / scale) for v in img.size],
+            'inference_size': list(img.size),
+            'scale': round(scale, 6),
+            'downscaled': scale < 1
+        }
+        return np.ascontiguousarray(rgb[:, :, ::-1]), info
+
+
+def attach_preprocessing(result, info):
+    """Map boxes back to original image coordinates and report the resize"""
+    scale = info['scale']
+    if scale != 1:
+        for detection in result['detections']:
+            detection['bbox'] = [value / scale for value in detection['bbox']]
+    result['preprocessing'] = info
+    return result
+
+
+def configure_torch_threads():
+    """
+    Pin torch's intra-op thread count so the process does not oversubscribe
+    the CPU. Cores are split between prefork workers (WEB_CONCURRENCY) and,
+    in parallel mode, between the two models. TORCH_THREADS overrides this.
+    """
+    threads = TORCH_THREADS
+    if not threads:
+        shares = SERVING_WORKERS * (2 if MODEL_EXECUTION == 'parallel' else 1)
+        if shares > 1:
+            threads = max(1, (os.cpu_count() or 1) // shares)
+    
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+        logger.info("🧵 Torch intra-op threads: %d", threads)
+
+
+def model_file_identity(path):
+    """Identify a weights file by path, mtime and size (or the fallback model)"""
     try:
-        # Check if custom models exist, otherwise use default YOLOv8
-        if os.path.exists(FLOWER_MODEL_PATH):
-            print(f"Loading flower model from {FLOWER_MODEL_PATH}")
-            flower_model = YOLO(FLOWER_MODEL_PATH)
-        else:
-            print("⚠️ Flower model not found. Using YOLOv8n as placeholder.")
-            print(f"   Place your trained model at: {FLOWER_MODEL_PATH}")
-            flower_model = YOLO('yolov8n.pt')  # Default model as fallback
+        stat = os.stat(path)
+    except OSError:
+        return 'yolov8n.pt'
+    return f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def current_model_fingerprint():
+    """Identity of the weights on disk and the backend that would load them"""
+    fingerprint = f"{INFERENCE_BACKEND}|{model_file_identity(FLOWER_MODEL_PATH)}|{model_file_identity(FRUIT_MODEL_PATH)}"
+    if MODEL_QUANTIZATION != 'none':
+        fingerprint += f"|int8-{MODEL_QUANTIZATION}"
+    return fingerprint
+
+
+@contextmanager
+def artifact_lock(weights):
+    """
+    Exclusive lock across processes on the artifacts built from `weights`.
+    Prefork workers (and their hot reloads) never export or quantize the
+    same file at once; the others wait and then reuse the finished artifact.
+    """
+    import fcntl
+    
+    with open(f"{os.path.splitext(weights)[0]}.artifacts.lock", 'w') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def artifact_source(source, **settings):
+    """
+    What an artifact built from `source` records as its origin: a hash of
+    the source's contents plus the build settings. Unlike mtimes it still
+    matches after the weights are copied with `cp -p` or `rsync -a`.
+    """
+    if not os.path.exists(source):
+        return None
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return ' '.join([digest.hexdigest()] + [f"{key}={value}" for key, value in sorted(settings.items())])
+
+
+def artifact_is_current(artifact, source):
+    """Whether `artifact` exists and was built from `source` (see artifact_source)"""
+    if not os.path.exists(artifact):
+        return False
+    if source is None:
+        # Nothing to compare with (e.g. the fallback weights are not downloaded yet)
+        return True
+    try:
+        with open(f"{artifact}.source") as f:
+            return f.read().strip() == source
+    except OSError:
+        return False
+
+
+def record_artifact_source(artifact, source):
+    """Store the origin of a freshly built artifact next to it"""
+    if source is not None:
+        with open(f"{artifact}.source", 'w') as f:
+            f.write(source + '\n')
+
+
+def build_artifact(weights):
+    """
+    The file the configured INFERENCE_BACKEND serves for `weights`.
+    For ONNX/OpenVINO the .pt weights are exported once and the artifact is
+    cached next to them (quantized too with MODEL_QUANTIZATION); it is
+    rebuilt whenever it was not built from the current weights.
+    """
+    if MODEL_QUANTIZATION != 'none' and INFERENCE_BACKEND != 'onnx':
+        raise ValueError("MODEL_QUANTIZATION requires INFERENCE_BACKEND=onnx")
+    
+    if INFERENCE_BACKEND == 'pytorch':
+        return weights
+    
+    if INFERENCE_BACKEND not in EXPORT_SUFFIXES:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{INFERENCE_BACKEND}'")
+    
+    with artifact_lock(weights):
+        artifact = os.path.splitext(weights)[0] + EXPORT_SUFFIXES[INFERENCE_BACKEND]
+        source = artifact_source(weights, imgsz=INFERENCE_IMGSZ)
         
-        if os.path.exists(FRUIT_MODEL_PATH):
-            print(f"Loading fruit model from {FRUIT_MODEL_PATH}")
-            fruit_model = YOLO(FRUIT_MODEL_PATH)
-        else:
-            print("⚠️ Fruit model not found. Using YOLOv8n as placeholder.")
-            print(f"   Place your trained model at: {FRUIT_MODEL_PATH}")
-            fruit_model = YOLO('yolov8n.pt')  # Default model as fallback
+        if not artifact_is_current(artifact, source):
+            logger.info("📦 Exporting %s to %s...", weights, INFERENCE_BACKEND)
+            artifact = YOLO(weights).export(format=INFERENCE_BACKEND, imgsz=INFERENCE_IMGSZ, dynamic=True)
+            record_artifact_source(artifact, source or artifact_source(weights, imgsz=INFERENCE_IMGSZ))
         
-        print("✅ Models loaded successfully")
+        if MODEL_QUANTIZATION != 'none':
+            artifact = quantize_model(artifact, MODEL_QUANTIZATION)
+    
+    return artifact
+
+
+def load_model(weights):
+    """
+    Build a YOLO model for the configured INFERENCE_BACKEND from the
+    artifact of build_artifact(). Returns the model and the file it was
+    loaded from.
+    """
+    artifact = build_artifact(weights)
+    if INFERENCE_BACKEND == 'pytorch':
+        return YOLO(weights), weights
+    return YOLO(artifact, task='detect'), artifact
+
+
+def build_artifacts():
+    """
+    Export (and quantize) both models without loading them. gunicorn runs
+    this once before forking, so workers only open their runtime sessions.
+    """
+    for name, path in (('flower', FLOWER_MODEL_PATH), ('fruit', FRUIT_MODEL_PATH)):
+        build_artifact(model_weights(name, path))
+
+
+def letterbox(image, size=INFERENCE_IMGSZ):
+    """
+    Resize a BGR array into a size x size NCHW float RGB tensor padded with
+    gray, matching the Ultralytics preprocessing of the exported model
+    """
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    resized = Image.fromarray(np.ascontiguousarray(image[:, :, ::-1])).resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+    
+    canvas = Image.new('RGB', (size, size), (114, 114, 114))
+    canvas.paste(resized, ((size - resized.width) // 2, (size - resized.height) // 2))
+    return (np.asarray(canvas, dtype=np.float32) / 255.0).transpose(2, 0, 1)[None]
+
+
+def calibration_images(folder=QUANT_CALIBRATION_DIR, limit=QUANT_CALIBRATION_IMAGES):
+    """Sorted image paths used to calibrate static quantization"""
+    if not os.path.isdir(folder):
+        raise ValueError(f"Static quantization needs calibration images in {folder} (QUANT_CALIBRATION_DIR)")
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if allowed_file(name))
+    if not paths:
+        raise ValueError(f"No calibration images found in {folder}")
+    return paths[:limit]
+
+
+def calibration_fingerprint():
+    """Short hash of the calibration image names and sizes"""
+    identity = '|'.join(f"{os.path.basename(path)}:{os.path.getsize(path)}" for path in calibration_images())
+    return hashlib.sha1(identity.encode()).hexdigest()[:12]
+
+
+def box_decoding_nodes(graph):
+    """
+    Names of the detection head's box-decoding nodes: everything in the
+    highest-numbered module ('/model.22/...' for YOLOv8) except its
+    convolutions, plus the DFL convolution, which decodes box distributions
+    rather than extracting features
+    """
+    modules = [int(node.name.split('/')[1].split('.')[1]) for node in graph.node
+               if node.name.startswith('/model.') and node.name.split('/')[1].split('.')[1].isdigit()]
+    if not modules:
+        return []
+    head = f"/model.{max(modules)}/"
+    return [node.name for node in graph.node
+            if node.name.startswith(head) and (node.op_type != 'Conv' or '/dfl/' in node.name)]
+
+
+def quantize_model(onnx_path, mode):
+    """
+    Build an INT8 copy of an exported ONNX model next to it, e.g.
+    flower_model.int8-static.onnx, and return its path. Like the export it
+    is rebuilt only when the FP32 model (or the calibration set) changed. Dynamic mode uses uint8
+    weights, the only kind ONNX Runtime's CPU ConvInteger kernel accepts in
+    older releases; static mode quantizes to QDQ with per-channel weights.
+    In both, the box decoding of the detection head (DFL included) stays in
+    FP32, since it is cheap and most sensitive to rounding.
+    """
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_dynamic, quantize_static)
+    import onnx
+    
+    if mode not in ('dynamic', 'static'):
+        raise ValueError(f"Unknown MODEL_QUANTIZATION '{mode}'")
+    
+    output = f"{os.path.splitext(onnx_path)[0]}.int8-{mode}.onnx"
+    settings = {}
+    if mode == 'static':
+        settings = {'calibration': QUANT_CALIBRATE_METHOD, 'images': calibration_fingerprint()}
+    source = artifact_source(onnx_path, **settings)
+    if artifact_is_current(output, source):
+        return output
+    
+    # Written under a temporary name, so an interrupted run never leaves a fresh-looking partial model
+    partial = f"{os.path.splitext(onnx_path)[0]}.int8-{mode}.partial.onnx"
+    
+    logger.info("🧮 Quantizing %s to INT8 (%s)...", onnx_path, mode)
+    start_time = time.perf_counter()
+    
+    graph = onnx.load(onnx_path).graph
+    exclude = box_decoding_nodes(graph)
+    
+    if mode == 'dynamic':
+        quantize_dynamic(onnx_path, partial, weight_type=QuantType.QUInt8, nodes_to_exclude=exclude)
+    else:
+        input_name = graph.input[0].name
+        
+        class CalibrationImages(CalibrationDataReader):
+            def __init__(self, paths):
+                self.paths = iter(paths)
+            
+            def get_next(self):
+                path = next(self.paths, None)
+                if path is None:
+                    return None
+                with open(path, 'rb') as f:
+                    image, _ = decode_image(f)
+                return {input_name: letterbox(image)}
+        
+        methods = {'minmax': CalibrationMethod.MinMax, 'entropy': CalibrationMethod.Entropy,
+                   'percentile': CalibrationMethod.Percentile}
+        quantize_static(
+            onnx_path, partial, CalibrationImages(calibration_images()),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=methods[QUANT_CALIBRATE_METHOD],
+            nodes_to_exclude=exclude
+        )
+    
+    os.replace(partial, output)
+    record_artifact_source(output, source)
+    logger.info("🧮 Quantized %s in %.1fs", output, time.perf_counter() - start_time)
+    return output
+
+
+def process_rss_mb():
+    """Resident memory of this process in MB (Linux), or None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_memory_mb():
+    """
+    RSS, PSS and USS of this process in MB (Linux), or None. Memory shared
+    copy-on-write with the gunicorn master and the other workers counts in
+    RSS but not in USS, so USS is what each extra worker costs.
+    """
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        'rss': round(fields.get('Rss', 0) / 1024, 1),
+        'pss': round(fields.get('Pss', 0) / 1024, 1),
+        'uss': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1)
+    }
+
+
+class ModelVersion:
+    """
+    One loaded pair of flower and fruit models. A request picks its version
+    once and keeps the reference until it is done, so swapping in a newer
+    version never changes the models under a running request; a retired
+    version is freed when its last request finishes.
+    """
+
+    def __init__(self, flower, fruit, fingerprint, artifacts=None, models=None):
+        self.flower = flower
+        self.fruit = fruit
+        self.fingerprint = fingerprint
+        self.name = hashlib.sha1(fingerprint.encode()).hexdigest()[:8]
+        self.artifacts = artifacts or {}
+        self.models = models or {}  # per-model load_seconds and rss_mb
+        self.loaded_at = time.time()
+        self.warmup_seconds = None
+        self.images = 0
+        self.in_flight = 0
+        # An Ultralytics predictor is not safe to call from several threads
+        self.model_locks = {'flower': threading.Lock(), 'fruit': threading.Lock()}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, images):
+        """Count an analysis of `images` images as in flight on this version"""
+        with self._lock:
+            self.in_flight += 1
+            self.images += images
+        MODEL_IMAGES_TOTAL.inc(images, version=self.name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def info(self):
+        return {
+            'name': self.name,
+            'fingerprint': self.fingerprint,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'warmup_seconds': self.warmup_seconds,
+            'images': self.images,
+            'in_flight': self.in_flight,
+            'models': {
+                name: {'artifact': self.artifacts.get(name), **self.models.get(name, {})}
+                for name in ('flower', 'fruit')
+            }
+        }
+
+
+def model_weights(name, path):
+    """Weights to serve for one model: the custom file if present, else YOLOv8n"""
+    # Check if custom models exist, otherwise use default YOLOv8
+    if os.path.exists(path):
+        logger.info("Loading %s model from %s", name, path)
+        return path
+    
+    logger.warning("⚠️ %s model not found. Using YOLOv8n as placeholder. "
+                   "Place your trained model at: %s", name.capitalize(), path)
+    return 'yolov8n.pt'  # Default model as fallback
+
+
+def load_version():
+    """Load the flower and fruit weights currently on disk as a new ModelVersion"""
+    # Read before loading, so a file replaced mid-load is picked up by the next check
+    fingerprint = current_model_fingerprint()
+    models, artifacts, stats = {}, {}, {}
+    
+    for name, path in (('flower', FLOWER_MODEL_PATH), ('fruit', FRUIT_MODEL_PATH)):
+        weights = model_weights(name, path)
+        
+        # RSS growth is approximate: requests served meanwhile allocate too
+        rss_before = process_rss_mb()
+        start_time = time.perf_counter()
+        models[name], artifacts[name] = load_model(weights)
+        rss_after = process_rss_mb()
+        stats[name] = {
+            'load_seconds': round(time.perf_counter() - start_time, 3),
+            'rss_mb': round(rss_after - rss_before, 1) if rss_before is not None else None
+        }
+    
+    return ModelVersion(models['flower'], models['fruit'], fingerprint, artifacts, stats)
+
+
+def activate_version(version):
+    """
+    Make `version` the newest version and retire the ones beyond
+    MODEL_VERSIONS_KEPT (or the length of MODEL_TRAFFIC_SPLIT). The list is
+    replaced, not mutated, so readers never see it half updated.
+    """
+    global model_versions, flower_model, fruit_model, model_fingerprint, model_artifacts
+    
+    kept = max(1, MODEL_VERSIONS_KEPT, len(MODEL_TRAFFIC_SPLIT))
+    with model_load_lock:
+        versions = [version] + [v for v in model_versions if v.name != version.name]
+        retired = versions[kept:]
+        model_versions = versions[:kept]
+        flower_model, fruit_model = version.flower, version.fruit
+        model_fingerprint = version.fingerprint
+        model_artifacts = dict(version.artifacts)
+    
+    for old in retired:
+        logger.info("🗑️ Retired model version %s (%d analyses still finishing on it)", old.name, old.in_flight)
+    return version
+
+
+def load_models():
+    """Load YOLOv8 models"""
+    with model_load_lock:
+        return _load_models()
+
+
+def _load_models():
+    try:
+        configure_torch_threads()
+        version = activate_version(load_version())
+        logger.info("✅ Models loaded successfully", extra={'backend': INFERENCE_BACKEND, 'version': version.name})
         return True
         
     except Exception as e:
-        print(f"❌ Error loading models: {e}")
+        logger.exception("❌ Error loading models: %s", e)
         return False
 
 
-def analyze_image(image_path):
+def setup_predictors():
     """
-    Run inference with both models and determine the dominant stage
+    Build the Ultralytics predictor of each loaded PyTorch model with one
+    tiny inference. The predictor deep-copies the model and fuses its
+    Conv+BatchNorm layers into newly allocated weights on its first call;
+    done in the gunicorn master, those weights are what the workers share
+    copy-on-write instead of each worker building a private copy.
     """
-    global flower_model, fruit_model
+    if INFERENCE_BACKEND != 'pytorch':
+        return
     
-    # Load models if not already loaded
-    if flower_model is None or fruit_model is None:
-        if not load_models():
-            raise Exception("Failed to load models")
+    import torch
     
+    # One thread: no OpenMP thread team is started in the master before fork
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
     try:
-        # Run inference with both models
-        flower_results = flower_model(image_path, conf=0.25)
-        fruit_results = fruit_model(image_path, conf=0.25)
-        
-        # Extract detections
-        flower_detections = []
-        flower_max_conf = 0
-        
-        for result in flower_results:
-            if result.boxes is not None and len(result.boxes) > 0:
-                for box in result.boxes:
-                    conf = float(box.conf[0])
-                    if conf > flower_max_conf:
-                        flower_max_conf = conf
-                    
-                    flower_detections.append({
-                        'bbox': box.xyxy[0].tolist(),
-                        'confidence': conf,
-                        'class': int(box.cls[0]),
-                        'class_name': result.names[int(box.cls[0])]
-                    })
-        
-        fruit_detections = []
-        fruit_max_conf = 0
-        
-        for result in fruit_results:
-            if result.boxes is not None and len(result.boxes) > 0:
-                for box in result.boxes:
-                    conf = float(box.conf[0])
-                    if conf > fruit_max_conf:
-                        fruit_max_conf = conf
-                    
-                    fruit_detections.append({
-                        'bbox': box.xyxy[0].tolist(),
-                        'confidence': conf,
-                        'class': int(box.cls[0]),
-                        'class_name': result.names[int(box.cls[0])]
-                    })
-        
-        # Determine dominant stage
-        stage = "Unknown"
-        confidence = 0
-        detections = []
-        health_summary = ""
-        recommendations = []
-        
-        if flower_max_conf > fruit_max_conf:
-            stage = "Flower"
-            confidence = flower_max_conf
-            detections = flower_detections
-            health_summary = f"Detected {len(flower_detections)} flower(s) in flowering stage"
-            recommendations = [
-                "Ensure adequate pollination",
-                "Maintain consistent watering",
-                "Monitor for pests on flowers",
-                "Avoid excessive fertilization during flowering"
-            ]
-        elif fruit_max_conf > 0:
-            stage = "Fruit"
-            confidence = fruit_max_conf
-            detections = fruit_detections
-            health_summary = f"Detected {len(fruit_detections)} fruit(s) in development stage"
-            recommendations = [
-                "Increase watering as fruits develop",
-                "Apply potassium-rich fertilizer",
-                "Support heavy fruit-bearing branches",
-                "Monitor for fruit flies and diseases"
-            ]
-        else:
-            # No strong detections from either model
-            stage = "Vegetative"
-            confidence = 0.5
-            health_summary = "Plant appears to be in vegetative growth stage"
-            recommendations = [
-                "Continue regular watering schedule",
-                "Apply balanced NPK fertilizer",
-                "Monitor leaf health",
-                "Ensure adequate sunlight"
-            ]
+        dummy = np.zeros((32, 32, 3), dtype=np.uint8)
+        for version in model_versions:
+            for model in (version.flower, version.fruit):
+                model([dummy], conf=CONFIDENCE_THRESHOLD, verbose=False)
+    finally:
+        torch.set_num_threads(threads)
+    logger.info("🔗 Predictors set up before forking")
+
+
+def warmup_models(version=None):
+    """
+    Run dummy inferences at the configured sizes so the first real request
+    does not pay for lazy initialization inside the models and runtimes
+    """
+    version = version or model_versions[0]
+    start_time = time.perf_counter()
+    for size in WARMUP_IMGSZ:
+        dummy = np.zeros((size, size, 3), dtype=np.uint8)
+        for _ in range(WARMUP_RUNS):
+            run_models([dummy], version)
+    version.warmup_seconds = round(time.perf_counter() - start_time, 2)
+    logger.info("🔥 Warmup done in %.2fs (sizes: %s)", version.warmup_seconds, WARMUP_IMGSZ)
+
+
+def reload_models():
+    """
+    Load the weights on disk as a new version in the background, warm it up
+    and swap it in. Requests keep being served by the current version
+    meanwhile. Returns the new version.
+    """
+    start_time = time.perf_counter()
+    version = load_version()
+    if WARMUP_ENABLED:
+        warmup_models(version)
+    activate_version(version)
+    
+    reload_stats['reloads'] += 1
+    MODEL_RELOADS_TOTAL.inc(result='swapped')
+    logger.info("🔄 Swapped in model version %s in %.1fs", version.name, time.perf_counter() - start_time,
+                extra={'fingerprint': version.fingerprint})
+    return version
+
+
+def watch_models():
+    """
+    Poll the weight files every MODEL_WATCH_INTERVAL seconds and hot reload
+    when they change. A change is acted on only once it looks the same on two
+    checks in a row, so a file that is still being copied is not loaded.
+    Weights that failed to load are not retried until they change again.
+    """
+    seen = None
+    failed = None
+    
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        reload_stats['checks'] += 1
+        fingerprint = current_model_fingerprint()
         
-        return {
-            'stage': stage,
-            'confidence': round(confidence, 3),
-            'detections': detections,
-            'health_summary': health_summary,
-            'recommendations': recommendations,
-            'detection_counts': {
-                'flowers': len(flower_detections),
-                'fruits': len(fruit_detections)
-            }
+        if fingerprint in (model_fingerprint, failed):
+            seen = None
+            continue
+        if fingerprint != seen:
+            seen = fingerprint
+            continue
+        
+        seen = None
+        try:
+            reload_models()
+            reload_stats['last_error'] = None
+        except Exception as e:
+            failed = fingerprint
+            reload_stats['failures'] += 1
+            reload_stats['last_error'] = str(e)
+            MODEL_RELOADS_TOTAL.inc(result='failed')
+            logger.exception("❌ Model reload failed, still serving %s: %s", model_versions[0].name, e)
+        # Outside a request, so nothing else publishes the reload counter
+        metrics_registry.flush()
+
+
+def start_model_watcher():
+    """Start the watcher thread; started lazily so a forked worker gets its own"""
+    global model_watcher
+    
+    if MODEL_WATCH_INTERVAL <= 0 or (model_watcher is not None and model_watcher.is_alive()):
+        return
+    model_watcher = threading.Thread(target=watch_models, name='model-watcher', daemon=True)
+    model_watcher.start()
+
+
+class UnknownModelVersion(Exception):
+    """A request asked for a model version that is not loaded"""
+
+
+def select_version(name=None):
+    """
+    The version that serves a request: `name` if given, otherwise a weighted
+    pick over the loaded versions by MODEL_TRAFFIC_SPLIT (newest first), or
+    the newest one when no split is set
+    """
+    ensure_models_loaded()
+    versions = model_versions
+    
+    if name:
+        for version in versions:
+            if version.name == name:
+                return version
+        raise UnknownModelVersion(name)
+    
+    weights = MODEL_TRAFFIC_SPLIT[:len(versions)]
+    if len(weights) < 2:
+        return versions[0]
+    return random.choices(versions[:len(weights)], weights=weights)[0]
+
+
+def ensure_models_loaded():
+    """
+    Load (and warm up) the models exactly once. Concurrent first requests
+    wait on the lock instead of each loading the weights.
+    """
+    global models_ready
+    
+    if models_ready:
+        return
+    
+    with model_load_lock:
+        if models_ready:
+            return
+        
+        if not model_versions:
+            if not _load_models():
+                raise Exception("Failed to load models")
+        
+        if WARMUP_ENABLED:
+            warmup_models()
+        
+        models_ready = True
+        start_model_watcher()
+
+
+def postprocess(result):
+    """
+    Copy one model result's boxes to host and summarize them with array ops.
+    The (N, 6) box tensor is transferred once instead of per box and field.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        data = np.zeros((0, 6), dtype=np.float32)
+    else:
+        data = boxes.data.cpu().numpy()
+    
+    conf = data[:, -2]
+    return {
+        'xyxy': data[:, :4],
+        'conf': conf,
+        'cls': data[:, -1].astype(np.int64),
+        'names': result.names,
+        'count': len(conf),
+        'max_conf': float(conf.max()) if len(conf) else 0
+    }
+
+
+def format_detections(processed):
+    """Build the JSON detection list from postprocess() output in bulk"""
+    names = processed['names']
+    return [
+        {
+            'bbox': bbox,
+            'confidence': conf,
+            'class': cls,
+            'class_name': names[cls]
+        }
+        for bbox, conf, cls in zip(processed['xyxy'].tolist(),
+                                   processed['conf'].tolist(),
+                                   processed['cls'].tolist())
+    ]
+
+
+# Stand-in for a model the cascade did not run; it can never win the stage
+SKIPPED_MODEL = {
+    'xyxy': np.zeros((0, 4), dtype=np.float32),
+    'conf': np.zeros(0, dtype=np.float32),
+    'cls': np.zeros(0, dtype=np.int64),
+    'names': {},
+    'count': None,
+    'max_conf': 0
+}
+
+
+def build_stage_result(flower_result, fruit_result):
+    """
+    Determine the dominant stage for one image from its flower and
+    fruit model results
+    """
+    return summarize_stage(postprocess(flower_result), postprocess(fruit_result))
+
+
+def summarize_stage(flowers, fruits):
+    """Determine the dominant stage from postprocess() output of both models"""
+    flower_max_conf = flowers['max_conf']
+    fruit_max_conf = fruits['max_conf']
+    
+    # Determine dominant stage
+    stage = "Unknown"
+    confidence = 0
+    detections = []
+    health_summary = ""
+    recommendations = []
+    
+    if flower_max_conf > fruit_max_conf:
+        stage = "Flower"
+        confidence = flower_max_conf
+        detections = format_detections(flowers)
+        health_summary = f"Detected {flowers['count']} flower(s) in flowering stage"
+        recommendations = [
+            "Ensure adequate pollination",
+            "Maintain consistent watering",
+            "Monitor for pests on flowers",
+            "Avoid excessive fertilization during flowering"
+        ]
+    elif fruit_max_conf > 0:
+        stage = "Fruit"
+        confidence = fruit_max_conf
+        detections = format_detections(fruits)
+        health_summary = f"Detected {fruits['count']} fruit(s) in development stage"
+        recommendations = [
+            "Increase watering as fruits develop",
+            "Apply potassium-rich fertilizer",
+            "Support heavy fruit-bearing branches",
+            "Monitor for fruit flies and diseases"
+        ]
+    else:
+        # No strong detections from either model
+        stage = "Vegetative"
+        confidence = 0.5
+        health_summary = "Plant appears to be in vegetative growth stage"
+        recommendations = [
+            "Continue regular watering schedule",
+            "Apply balanced NPK fertilizer",
+            "Monitor leaf health",
+            "Ensure adequate sunlight"
+        ]
+    
+    return {
+        'stage': stage,
+        'confidence': round(confidence, 3),
+        'detections': detections,
+        'health_summary': health_summary,
+        'recommendations': recommendations,
+        'detection_counts': {
+            'flowers': flowers['count'],
+            'fruits': fruits['count']
         }
+    }
+
+
+def get_model_executor():
+    """Thread pool used to run the fruit model alongside the flower model"""
+    global model_executor
+    if model_executor is None:
+        model_executor = ThreadPoolExecutor(max_workers=MODEL_EXECUTOR_WORKERS,
+                                            thread_name_prefix='model')
+    return model_executor
+
+
+def infer(version, name, images):
+    """
+    Run the `name` model of `version` over the images, recording its latency
+    under '<name>_inference'. Calls into the same model are serialized, as
+    request threads and the parallel executor share one predictor per model;
+    the other model can run meanwhile.
+    """
+    with version.model_locks[name]:
+        with STAGE_SECONDS.time(stage=f'{name}_inference'):
+            return getattr(version, name)(images, conf=CONFIDENCE_THRESHOLD)
+
+
+def run_models(images, version):
+    """
+    Run the flower and fruit models of `version` on the same input. In
+    parallel mode the fruit model runs on the executor while the flower
+    model runs on the calling thread, so latency is roughly the slower of
+    the two.
+    """
+    if MODEL_EXECUTION == 'parallel':
+        fruit_future = get_model_executor().submit(infer, version, 'fruit', images)
+        flower_results = infer(version, 'flower', images)
+        return flower_results, fruit_future.result()
+    
+    flower_results = infer(version, 'flower', images)
+    fruit_results = infer(version, 'fruit', images)
+    return flower_results, fruit_results
+
+
+def cascade_first_model():
+    """The model the cascade runs first; 'auto' picks the stage seen most so far"""
+    if CASCADE_FIRST_MODEL == 'auto':
+        return 'fruit' if cascade_stats['fruit'] > cascade_stats['flower'] else 'flower'
+    return CASCADE_FIRST_MODEL
+
+
+def run_cascade(images, version):
+    """
+    Early-exit cascade: run the likelier model first and only run the other
+    one for images whose top confidence is below CASCADE_MARGIN.
+    Returns one stage result per image, each with a 'cascade' audit block.
+    """
+    first = cascade_first_model()
+    second = 'fruit' if first == 'flower' else 'flower'
+    first_results = infer(version, first, images)
+    with STAGE_SECONDS.time(stage='postprocess'):
+        first_processed = [postprocess(result) for result in first_results]
+    
+    second_processed = [SKIPPED_MODEL] * len(images)
+    pending = [i for i, processed in enumerate(first_processed) if processed['max_conf'] < CASCADE_MARGIN]
+    if pending:
+        second_results = infer(version, second, [images[i] for i in pending])
+        with STAGE_SECONDS.time(stage='postprocess'):
+            for i, result in zip(pending, second_results):
+                second_processed[i] = postprocess(result)
+    
+    results = []
+    with STAGE_SECONDS.time(stage='postprocess'):
+        for first_output, second_output in zip(first_processed, second_processed):
+            outputs = {first: first_output, second: second_output}
+            result = summarize_stage(outputs['flower'], outputs['fruit'])
+            short_circuited = second_output is SKIPPED_MODEL
+            result['cascade'] = {
+                'first_model': first,
+                'short_circuited': short_circuited,
+                'skipped_model': second if short_circuited else None,
+                'margin': CASCADE_MARGIN
+            }
+            results.append(result)
+    
+    with cascade_lock:
+        for result in results:
+            cascade_stats['images'] += 1
+            cascade_stats['short_circuited'] += result['cascade']['short_circuited']
+            if result['stage'] in ('Flower', 'Fruit'):
+                cascade_stats[result['stage'].lower()] += 1
+    
+    return results
+
+
+def analyze_images(images, version=None):
+    """
+    Run both models over a list of images as batched forward passes, all on
+    the same model version (select_version() when not given).
+    Returns one stage result per image, in input order.
+    """
+    version = version or select_version()
+    
+    try:
+        results = []
+        with version.track(len(images)):
+            for start in range(0, len(images), PREDICT_BATCH_SIZE):
+                chunk = images[start:start + PREDICT_BATCH_SIZE]
+                if CASCADE_MODE:
+                    results.extend(run_cascade(chunk, version))
+                    continue
+                
+                flower_results, fruit_results = run_models(chunk, version)
+                with STAGE_SECONDS.time(stage='postprocess'):
+                    results.extend(
+                        build_stage_result(flower_result, fruit_result)
+                        for flower_result, fruit_result in zip(flower_results, fruit_results)
+                    )
+        
+        for result in results:
+            result['model_version'] = version.name
+        return results
         
     except Exception as e:
         raise Exception(f"Analysis error: {str(e)}")
 
 
+def analyze_image(image, version=None):
+    """
+    Run inference with both models and determine the dominant stage.
+    `image` is a decoded array from decode_image() or a path on disk.
+    """
+    return analyze_images([image], version)[0]
+
+
+def tile_grid(width, height, size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """
+    Top-left corners of overlapping size x size tiles covering the image.
+    The last row/column is shifted back inside the image, not padded.
+    """
+    stride = max(1, int(size * (1 - overlap)))
+    
+    def starts(length):
+        if length <= size:
+            return [0]
+        positions = list(range(0, length - size, stride))
+        return positions + [length - size]
+    
+    return [(x, y) for y in starts(height) for x in starts(width)]
+
+
+def merge_detections(xyxy, conf, cls, threshold=TILE_MERGE_THRESHOLD):
+    """
+    Class-aware greedy NMS across tiles. Overlap is measured as
+    intersection over the smaller box, so a box cut off at a tile edge is
+    merged into the complete box from the neighbouring tile.
+    Returns the indices to keep, highest confidence first.
+    """
+    areas = np.clip(xyxy[:, 2] - xyxy[:, 0], 0, None) * np.clip(xyxy[:, 3] - xyxy[:, 1], 0, None)
+    order = conf.argsort()[::-1]
+    keep = []
+    
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        
+        width = np.clip(np.minimum(xyxy[best, 2], xyxy[rest, 2]) - np.maximum(xyxy[best, 0], xyxy[rest, 0]), 0, None)
+        height = np.clip(np.minimum(xyxy[best, 3], xyxy[rest, 3]) - np.maximum(xyxy[best, 1], xyxy[rest, 1]), 0, None)
+        smaller = np.maximum(np.minimum(areas[best], areas[rest]), 1e-6)
+        duplicate = (width * height / smaller > threshold) & (cls[rest] == cls[best])
+        order = rest[~duplicate]
+    
+    return np.array(keep, dtype=np.int64)
+
+
+def merge_tile_results(processed, placements):
+    """Shift each tile's boxes into full-image coordinates and merge them into one postprocess() dict"""
+    boxes = [item['xyxy'] / scale + [x, y, x, y] for item, (x, y, scale) in zip(processed, placements)]
+    xyxy = np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+    conf = np.concatenate([item['conf'] for item in processed]) if processed else np.zeros(0, dtype=np.float32)
+    cls = np.concatenate([item['cls'] for item in processed]) if processed else np.zeros(0, dtype=np.int64)
+    
+    keep = merge_detections(xyxy, conf, cls)
+    return {
+        'xyxy': xyxy[keep],
+        'conf': conf[keep],
+        'cls': cls[keep],
+        'names': processed[0]['names'] if processed else {},
+        'count': len(keep),
+        'max_conf': float(conf[keep].max()) if len(keep) else 0
+    }, len(conf)
+
+
+def analyze_tiled(image, version=None):
+    """
+    Split a large image into overlapping TILE_SIZE tiles (plus the whole
+    image downscaled to one tile when TILE_INCLUDE_FULL), run every tile
+    through both models in batches of TILE_BATCH_SIZE and merge the
+    detections back into full-image coordinates with cross-tile NMS.
+    The result carries a 'tiling' block with the per-image overhead.
+    """
+    version = version or select_version()
+    start_time = time.perf_counter()
+    height, width = image.shape[:2]
+    
+    inputs = []
+    placements = []    # (x offset, y offset, scale) mapping tile boxes to the image
+    for x, y in tile_grid(width, height):
+        inputs.append(np.ascontiguousarray(image[y:y + TILE_SIZE, x:x + TILE_SIZE]))
+        placements.append((x, y, 1.0))
+    
+    if TILE_INCLUDE_FULL and len(inputs) > 1:
+        scale = TILE_SIZE / max(width, height)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # Stride-subsample to about twice the target first; resizing the full frame costs more than the tiles
+        step = max(1, int(max(width, height) / (2 * TILE_SIZE)))
+        preview = np.ascontiguousarray(image[::step, ::step])
+        inputs.append(np.asarray(Image.fromarray(preview).resize(size, Image.BILINEAR)))
+        placements.append((0, 0, scale))
+    
+    inference_start = time.perf_counter()
+    flowers, fruits = [], []
+    with version.track(1):
+        for start in range(0, len(inputs), TILE_BATCH_SIZE):
+            flower_results, fruit_results = run_models(inputs[start:start + TILE_BATCH_SIZE], version)
+            with STAGE_SECONDS.time(stage='postprocess'):
+                flowers.extend(postprocess(result) for result in flower_results)
+                fruits.extend(postprocess(result) for result in fruit_results)
+    inference_time = time.perf_counter() - inference_start
+    
+    merge_start = time.perf_counter()
+    with STAGE_SECONDS.time(stage='tile_merge'):
+        merged_flowers, raw_flowers = merge_tile_results(flowers, placements)
+        merged_fruits, raw_fruits = merge_tile_results(fruits, placements)
+        result = summarize_stage(merged_flowers, merged_fruits)
+    merge_time = time.perf_counter() - merge_start
+    
+    result['tiling'] = {
+        'tiles': len(inputs),
+        'tile_size': TILE_SIZE,
+        'overlap': TILE_OVERLAP,
+        'full_image_pass': TILE_INCLUDE_FULL and len(inputs) > 1,
+        'detections_before_merge': raw_flowers + raw_fruits,
+        'detections_after_merge': merged_flowers['count'] + merged_fruits['count'],
+        'tile_ms': round((inference_start - start_time) * 1000, 1),
+        'inference_ms': round(inference_time * 1000, 1),
+        'merge_ms': round(merge_time * 1000, 1)
+    }
+    result['model_version'] = version.name
+    return result
+
+
+def wants_tiled():
+    """Tiled analysis when TILED_MODE is set or the request passes ?tiled=true"""
+    value = request.args.get('tiled')
+    if value is None:
+        return TILED_MODE
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-image requests into batched forward passes.
+    A batch is dispatched once it holds `max_batch_size` images or the
+    oldest image has waited `max_wait_ms`, whichever comes first. Images
+    for different model versions are run as separate forward passes.
+    """
+
+    def __init__(self, handler, max_batch_size, max_wait_ms):
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, image, version):
+        """Queue one image and block until its result is ready"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((image, version, future))
+        return future.result()
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0
+        }
+
+    def _ensure_worker(self):
+        # Started lazily so a forked worker process gets its own thread
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.items += len(batch)
+            
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            
+            for version, items in groups.items():
+                try:
+                    results = self.handler([image for image, _, _ in items], version)
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
+                    continue
+                
+                for (_, _, future), result in zip(items, results):
+                    future.set_result(result)
+
+
+predict_batcher = MicroBatcher(analyze_images, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS) if MICRO_BATCHING else None
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of analysis results with a TTL and a memory bound.
+    Entry size is estimated from the serialized JSON of the result.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, result):
+        size = len(json.dumps(result))
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, result)
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': True,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL) if RESULT_CACHE_MAX_ENTRIES > 0 else None
+
+
+def result_cache_key(stream, version, tiled=False):
+    """Hash the upload bytes together with everything that affects the result"""
+    digest = hashlib.sha256(stream.getbuffer())
+    digest.update(f"|{CONFIDENCE_THRESHOLD}|{version.fingerprint}".encode())
+    if tiled:
+        digest.update(f"|tiled:{TILE_SIZE}:{TILE_OVERLAP}:{TILE_MAX_SIDE}:{TILE_INCLUDE_FULL}:{TILE_MERGE_THRESHOLD}".encode())
+    return digest.hexdigest()
+
+
+def serialize(payload):
+    """jsonify() with its cost recorded as the serialize stage"""
+    with STAGE_SECONDS.time(stage='serialize'):
+        return jsonify(payload)
+
+
+def cache_stats():
+    return result_cache.stats() if result_cache else {'enabled': False}
+
+
+def frame_hash(image):
+    """64-bit difference hash (dHash) of a BGR frame, for near-duplicate detection"""
+    # Subsample to ~64px before the luma conversion so hashing stays cheap at any resolution
+    step = max(1, min(image.shape[:2]) // 64)
+    small = image[::step, ::step].astype(np.float32)
+    luma = small[:, :, 0] * 0.114 + small[:, :, 1] * 0.587 + small[:, :, 2] * 0.299
+    pixels = np.asarray(Image.fromarray(luma, mode='F').resize((9, 8), Image.BILINEAR))
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hash_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def resize_frame(frame, max_side=None):
+    """Downscale a decoded BGR video frame like decode_image() does for uploads"""
+    max_side = MAX_INPUT_SIDE if max_side is None else max_side
+    height, width = frame.shape[:2]
+    scale = 1.0
+    
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        frame = np.asarray(Image.fromarray(frame).resize(size, Image.BILINEAR))
+    
+    return frame, {
+        'original_size': [width, height],
+        'inference_size': [frame.shape[1], frame.shape[0]],
+        'scale': round(scale, 6),
+        'downscaled': scale < 1
+    }
+
+
+def iter_video_frames(path, sample_fps, max_frames):
+    """
+    Yield (timestamp, frame, info) for frames sampled at `sample_fps` from a
+    video file. Frames between samples are only grabbed, not decoded.
+    """
+    import cv2  # installed with ultralytics
+    
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError('Could not open video')
+    
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, round(fps / sample_fps)) if sample_fps > 0 else 1
+        position = 0
+        sampled = 0
+        
+        while sampled < max_frames:
+            if not capture.grab():
+                break
+            if position % step == 0:
+                with STAGE_SECONDS.time(stage='decode'):
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        break
+                    frame, info = resize_frame(frame)
+                yield round(position / fps, 3), frame, info
+                sampled += 1
+            position += 1
+    finally:
+        capture.release()
+
+
+def iter_uploaded_frames(files):
+    """Yield (timestamp, frame, info) for uploaded still frames; undecodable ones are skipped"""
+    for file in files:
+        try:
+            image, info = decode_image(upload_buffer(file.stream))
+        except (UnidentifiedImageError, OSError):
+            continue
+        yield None, image, info
+
+
+def analyze_frame_stream(frames, dedupe_distance=STREAM_DEDUPE_DISTANCE, with_detections=False, version=None):
+    """
+    Analyze a stream of (timestamp, frame, info) and yield one dict per
+    sampled frame, then an aggregate summary. A frame whose dHash is within
+    `dedupe_distance` bits of the last analyzed frame skips the models and
+    reuses that frame's result ('duplicate_of'). Analyzed frames go through
+    the models in batches of PREDICT_BATCH_SIZE, all on the same version.
+    """
+    version = version or select_version()
+    start_time = time.perf_counter()
+    pending = []    # (entry, analyzed entry it duplicates or None), in frame order
+    batch = []      # (entry, frame, info) waiting for the models
+    last_hash = None
+    last_kept = None
+    sampled = 0
+    analyzed = 0
+    stage_frames = {}
+    best = {}
+    max_counts = {'flowers': 0, 'fruits': 0}
+    
+    def flush():
+        analyses = analyze_images([frame for _, frame, _ in batch], version) if batch else []
+        for (entry, _, info), analysis in zip(batch, analyses):
+            attach_preprocessing(analysis, info)
+            entry.update({
+                'stage': analysis['stage'],
+                'confidence': analysis['confidence'],
+                'detection_counts': analysis['detection_counts']
+            })
+            if with_detections:
+                entry['detections'] = analysis['detections']
+            if analysis['confidence'] >= best.get(analysis['stage'], {}).get('confidence', -1):
+                best[analysis['stage']] = analysis
+            for key in max_counts:
+                max_counts[key] = max(max_counts[key], analysis['detection_counts'][key] or 0)
+        
+        for entry, source in pending:
+            if source is not None:
+                entry['stage'] = source['stage']
+                entry['confidence'] = source['confidence']
+            stage_frames[entry['stage']] = stage_frames.get(entry['stage'], 0) + 1
+            yield entry
+        
+        pending.clear()
+        batch.clear()
+    
+    for timestamp, frame, info in frames:
+        entry = {'type': 'frame', 'frame': sampled, 'timestamp': timestamp}
+        sampled += 1
+        
+        digest = frame_hash(frame)
+        if last_kept is not None and dedupe_distance >= 0 and \
+                hash_distance(digest, last_hash) <= dedupe_distance:
+            entry['duplicate_of'] = last_kept['frame']
+            pending.append((entry, last_kept))
+            continue
+        
+        last_hash, last_kept = digest, entry
+        analyzed += 1
+        batch.append((entry, frame, info))
+        pending.append((entry, None))
+        
+        if len(batch) >= PREDICT_BATCH_SIZE:
+            yield from flush()
+    
+    yield from flush()
+    
+    # The aggregate stage is the one seen in most sampled frames; its
+    # best-scoring frame supplies the confidence and recommendations
+    stage = max(stage_frames, key=stage_frames.get) if stage_frames else 'Unknown'
+    representative = best.get(stage, {})
+    yield {
+        'type': 'summary',
+        'stage': stage,
+        'confidence': representative.get('confidence', 0),
+        'stage_share': {name: round(count / sampled, 3) for name, count in stage_frames.items()},
+        'max_detection_counts': max_counts,
+        'health_summary': representative.get('health_summary', ''),
+        'recommendations': representative.get('recommendations', []),
+        'frames_sampled': sampled,
+        'frames_analyzed': analyzed,
+        'frames_skipped': sampled - analyzed,
+        'model_version': version.name,
+        'total_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    limit = request.max_content_length // (1024 * 1024)
+    return jsonify({'error': f'Upload too large. Maximum is {limit}MB'}), 413
+
+
+@app.errorhandler(UnknownModelVersion)
+def unknown_model_version(e):
+    return jsonify({'error': f'Model version {e} is not loaded',
+                    'versions': [version.name for version in model_versions]}), 404
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -183,11 +1530,28 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'models_loaded': models_loaded,
+        'ready': models_ready,
         'flower_model_exists': os.path.exists(FLOWER_MODEL_PATH),
-        'fruit_model_exists': os.path.exists(FRUIT_MODEL_PATH)
+        'fruit_model_exists': os.path.exists(FRUIT_MODEL_PATH),
+        'model_execution': MODEL_EXECUTION,
+        'cascade': {'enabled': CASCADE_MODE, 'first_model': cascade_first_model(),
+                    'margin': CASCADE_MARGIN, **cascade_stats} if CASCADE_MODE else {'enabled': False},
+        'tiling': {'default': TILED_MODE, 'tile_size': TILE_SIZE, 'overlap': TILE_OVERLAP,
+                   'batch_size': TILE_BATCH_SIZE, 'max_side': TILE_MAX_SIDE},
+        'result_cache': cache_stats(),
+        'micro_batching': predict_batcher.stats() if predict_batcher else {'enabled': False},
+        'logging': logs.stats()
     })
 
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: 503 until the models are loaded and warmed up"""
+    if not models_ready:
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True})
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
@@ -195,11 +1559,15 @@ def predict():
     Accepts image file and returns analysis
     """
     try:
+        # Parsing the multipart body is where the upload is received
+        with STAGE_SECONDS.time(stage='upload_receive'):
+            files = request.files
+        
         # Check if file is in request
-        if 'file' not in request.files:
+        if 'file' not in files:
             return jsonify({'error': 'No file provided'}), 400
         
-        file = request.files['file']
+        file = files['file']
         
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
@@ -207,29 +1575,204 @@ def predict():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only PNG, JPG, JPEG allowed'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        tiled = wants_tiled()
+        version = select_version(request.args.get('model_version'))
+        
+        # Retries and re-analysis of the same photo are served from the cache
+        cache_key = result_cache_key(file.stream, version, tiled) if result_cache else None
+        if cache_key:
+            result = result_cache.get(cache_key)
+            if result is not None:
+                return serialize(result)
         
+        # Decode straight from the in-memory upload, no temp file. Tiled
+        # analysis keeps the resolution that the tiles are cut from.
         try:
-            # Run analysis
-            result = analyze_image(filepath)
+            image, preprocessing = decode_image(file.stream, max_side=TILE_MAX_SIDE if tiled else None)
+        except (UnidentifiedImageError, OSError):
+            return jsonify({'error': 'Could not decode image'}), 400
+        
+        # Run analysis, coalesced with concurrent requests when enabled
+        if tiled:
+            result = analyze_tiled(image, version)
+        elif predict_batcher is not None:
+            result = predict_batcher.submit(image, version)
+        else:
+            result = analyze_image(image, version)
+        
+        attach_preprocessing(result, preprocessing)
+        
+        if cache_key:
+            result_cache.put(cache_key, result)
+        
+        return serialize(result)
+        
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
+    except UnknownModelVersion as e:
+        return unknown_model_version(e)
+    except Exception as e:
+        logger.exception("❌ Prediction error: %s", e, extra={'path': request.path})
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Batch prediction endpoint
+    Accepts several images under the `files` field and analyzes them
+    with one batched forward pass per model
+    """
+    try:
+        with STAGE_SECONDS.time(stage='upload_receive'):
+            files = request.files.getlist('files')
+        
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'Too many files. Maximum is {MAX_BATCH_FILES} per request'}), 400
+        
+        tiled = wants_tiled()
+        version = select_version(request.args.get('model_version'))
+        start_time = time.perf_counter()
+        
+        # Decode everything first; files that fail keep their slot with an error
+        results = [None] * len(files)
+        images = []
+        preprocessing = []
+        positions = []
+        cache_keys = {}
+        cached_count = 0
+        
+        for index, file in enumerate(files):
+            if file.filename == '' or not allowed_file(file.filename):
+                results[index] = {'filename': file.filename, 'error': 'Invalid file type. Only PNG, JPG, JPEG allowed'}
+                continue
             
-            # Clean up temporary file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            if upload_size(file.stream) > MAX_UPLOAD_BYTES:
+                results[index] = {'filename': file.filename, 'error': f'File too large. Maximum is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB'}
+                continue
             
-            return jsonify(result)
+            # Only the file being decoded is in memory; the rest stay spooled
+            stream = upload_buffer(file.stream)
+            if result_cache:
+                cache_keys[index] = result_cache_key(stream, version, tiled)
+                cached = result_cache.get(cache_keys[index])
+                if cached is not None:
+                    results[index] = {'filename': file.filename, **cached}
+                    cached_count += 1
+                    continue
             
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            raise e
+            try:
+                image, info = decode_image(stream, max_side=TILE_MAX_SIDE if tiled else None)
+                images.append(image)
+                preprocessing.append(info)
+                positions.append(index)
+            except (UnidentifiedImageError, OSError):
+                results[index] = {'filename': file.filename, 'error': 'Could not decode image'}
         
+        decode_time = time.perf_counter() - start_time
+        
+        # Run both models over the whole batch
+        inference_start = time.perf_counter()
+        if tiled:
+            analyses = [analyze_tiled(image, version) for image in images]
+        else:
+            analyses = analyze_images(images, version) if images else []
+        inference_time = time.perf_counter() - inference_start
+        
+        for index, analysis, info in zip(positions, analyses, preprocessing):
+            attach_preprocessing(analysis, info)
+            results[index] = {'filename': files[index].filename, **analysis}
+            if index in cache_keys:
+                result_cache.put(cache_keys[index], analysis)
+        
+        total_time = time.perf_counter() - start_time
+        
+        return serialize({
+            'count': len(results),
+            'analyzed': len(analyses),
+            'cached': cached_count,
+            'results': results,
+            'timing': {
+                'decode_ms': round(decode_time * 1000, 1),
+                'inference_ms': round(inference_time * 1000, 1),
+                'total_ms': round(total_time * 1000, 1),
+                'per_image_ms': round(total_time * 1000 / len(results), 1)
+            }
+        })
+        
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
+    except UnknownModelVersion as e:
+        return unknown_model_version(e)
+    except Exception as e:
+        logger.exception("❌ Prediction error: %s", e, extra={'path': request.path})
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Analyze a short video (multipart field 'video') or a sequence of frames
+    (repeated field 'frames'). Streams newline-delimited JSON: one line per
+    sampled frame as soon as its batch is done, then one summary line with
+    the aggregate stage.
+    Query parameters: sample_fps (video only), detections=true to include
+    per-frame boxes, model_version to pin a loaded version.
+    """
+    video_file = None
+    
+    try:
+        video = request.files.get('video')
+        frames = [file for file in request.files.getlist('frames') if file.filename]
+        with_detections = request.args.get('detections', '').lower() in ('1', 'true', 'yes')
+        version = select_version(request.args.get('model_version'))
+        
+        try:
+            sample_fps = float(request.args.get('sample_fps', STREAM_SAMPLE_FPS))
+        except ValueError:
+            return jsonify({'error': 'sample_fps must be a number'}), 400
+        
+        if video is not None and video.filename:
+            extension = video.filename.rsplit('.', 1)[-1].lower() if '.' in video.filename else ''
+            if extension not in VIDEO_EXTENSIONS:
+                return jsonify({'error': f"Invalid video type. Allowed: {', '.join(sorted(VIDEO_EXTENSIONS))}"}), 400
+            
+            # The upload was spooled to a named temp file; OpenCV reads it by path
+            video_file = video.stream
+            video_file.flush()
+            source = iter_video_frames(video_file.name, sample_fps, STREAM_MAX_FRAMES)
+        elif frames:
+            if len(frames) > STREAM_MAX_FRAMES:
+                return jsonify({'error': f'Too many frames. Maximum is {STREAM_MAX_FRAMES} per request'}), 400
+            if not all(allowed_file(file.filename) for file in frames):
+                return jsonify({'error': 'Invalid file type. Only PNG, JPG, JPEG allowed'}), 400
+            source = iter_uploaded_frames(frames)
+        else:
+            return jsonify({'error': "No video or frames provided"}), 400
+        
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
+    except UnknownModelVersion as e:
+        return unknown_model_version(e)
     except Exception as e:
+        logger.exception("❌ Stream setup error: %s", e, extra={'path': request.path})
         return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        try:
+            for line in analyze_frame_stream(source, with_detections=with_detections, version=version):
+                yield json.dumps(line) + '\n'
+        except Exception as e:
+            logger.exception("❌ Stream analysis error: %s", e, extra={'path': '/predict/stream'})
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+        finally:
+            if video_file is not None:
+                video_file.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/models/info', methods=['GET'])
@@ -239,13 +1782,29 @@ def models_info():
         'flower_model': {
             'path': FLOWER_MODEL_PATH,
             'exists': os.path.exists(FLOWER_MODEL_PATH),
-            'loaded': flower_model is not None
+            'loaded': flower_model is not None,
+            'artifact': model_artifacts.get('flower')
         },
         'fruit_model': {
             'path': FRUIT_MODEL_PATH,
             'exists': os.path.exists(FRUIT_MODEL_PATH),
-            'loaded': fruit_model is not None
-        }
+            'loaded': fruit_model is not None,
+            'artifact': model_artifacts.get('fruit')
+        },
+        'backend': INFERENCE_BACKEND,
+        'quantization': MODEL_QUANTIZATION,
+        'confidence_threshold': CONFIDENCE_THRESHOLD,
+        'fingerprint': model_fingerprint,
+        'versions': [version.info() for version in model_versions],
+        'hot_reload': {
+            'enabled': MODEL_WATCH_INTERVAL > 0,
+            'watch_interval': MODEL_WATCH_INTERVAL,
+            'versions_kept': max(1, MODEL_VERSIONS_KEPT, len(MODEL_TRAFFIC_SPLIT)),
+            'traffic_split': MODEL_TRAFFIC_SPLIT or None,
+            **reload_stats
+        },
+        'result_cache': cache_stats(),
+        'worker': {'pid': os.getpid(), 'memory_mb': process_memory_mb()}
     })
 
 
@@ -256,9 +1815,12 @@ if __name__ == '__main__':
     print(f"Fruit model path: {FRUIT_MODEL_PATH}")
     print("=" * 50)
     
-    # Preload models
+    # Preload and warm up models before accepting traffic
     print("\n🔄 Loading models...")
-    load_models()
+    try:
+        ensure_models_loaded()
+    except Exception as e:
+        logger.warning("❌ %s. Will retry on the first request.", e)
     
     print("\n🚀 Starting Flask server on port 8000...")
     app.run(host='0.0.0.0', port=8000, debug=True)
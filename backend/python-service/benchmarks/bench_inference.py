@@ -0,0 +1,266 @@
+"""
+BloomIQ - Offline benchmark for the local YOLO inference service
+
+Drives decode_image / analyze_image and the /predict route of app.py through
+the Flask test client with synthetic images, and reports throughput and
+p50/p95/p99 latency per stage. Results are written as JSON so runs from
+different commits can be compared.
+
+Usage (from backend/python-service):
+    python benchmarks/bench_inference.py --model stub
+    python benchmarks/bench_inference.py --model yolov8n --weights yolov8n.pt
+    python benchmarks/bench_inference.py --model stub --compare benchmarks/results/old.json
+
+`stub` replaces both models with a fixed-output stand-in, so it measures pure
+service overhead and needs neither torch nor ultralytics. `yolov8n` loads the
+given weights for both models; the file must exist locally since the run is
+offline. Service settings (MODEL_EXECUTION, INFERENCE_BACKEND, ...) are read
+from the environment as usual.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+DEFAULT_RESOLUTIONS = ['640x480', '1920x1080', '4032x3024']
+
+
+class StubTensor:
+    """Minimal stand-in for a torch tensor on the host"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class StubBoxes:
+    def __init__(self, data):
+        self.data = StubTensor(data)
+
+    def __len__(self):
+        return len(self.data.array)
+
+
+class StubResult:
+    def __init__(self, data, names):
+        self.boxes = StubBoxes(data)
+        self.names = names
+
+
+class StubModel:
+    """
+    Fixed-output model: returns `boxes` detections per image after an
+    optional fixed delay, so only the service's own overhead is measured
+    """
+
+    def __init__(self, boxes=20, delay_ms=0.0, seed=0):
+        rng = np.random.default_rng(seed)
+        xy = rng.uniform(0, 600, (boxes, 2))
+        self.data = np.column_stack([
+            xy, xy + rng.uniform(10, 40, (boxes, 2)),
+            rng.uniform(0.25, 0.95, boxes), rng.integers(0, 2, boxes)
+        ]).astype(np.float32)
+        self.names = {0: 'flower', 1: 'fruit'}
+        self.delay = delay_ms / 1000.0
+
+    def __call__(self, source, conf=0.25, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        if self.delay:
+            time.sleep(self.delay)
+        return [StubResult(self.data, self.names) for _ in images]
+
+
+def import_service(stub):
+    """Import app.py; in stub mode ultralytics is not required"""
+    sys.path.insert(0, str(SERVICE_DIR))
+    os.chdir(SERVICE_DIR)
+    os.environ.setdefault('WARMUP_ENABLED', 'false')
+    
+    if stub:
+        try:
+            import ultralytics  # noqa: F401
+        except ImportError:
+            placeholder = types.ModuleType('ultralytics')
+            placeholder.YOLO = None
+            sys.modules['ultralytics'] = placeholder
+    
+    import app
+    return app
+
+
+def synthetic_jpeg(width, height, seed):
+    """Noisy gradient image, JPEG encoded like a phone upload"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = gradient + rng.normal(0, 40, (height, width, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def summarize(samples):
+    """Latency percentiles (ms) and throughput for one stage"""
+    values = np.array(samples) * 1000
+    return {
+        'n': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'throughput_per_s': round(1000.0 / float(values.mean()), 2) if values.mean() else 0
+    }
+
+
+def timed(stage_times, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    stage_times.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def bench_resolution(app, client, width, height, iterations, warmup):
+    payloads = [synthetic_jpeg(width, height, seed) for seed in range(4)]
+    stage_times = {}
+    
+    for i in range(warmup + iterations):
+        data = payloads[i % len(payloads)]
+        times = stage_times if i >= warmup else {}
+        
+        image, _ = timed(times, 'decode', app.decode_image, io.BytesIO(data))
+        flower = timed(times, 'flower_inference', app.flower_model, [image], conf=app.CONFIDENCE_THRESHOLD)
+        fruit = timed(times, 'fruit_inference', app.fruit_model, [image], conf=app.CONFIDENCE_THRESHOLD)
+        result = timed(times, 'postprocess', app.build_stage_result, flower[0], fruit[0])
+        timed(times, 'serialize', json.dumps, result)
+        timed(times, 'analyze_image', app.analyze_image, image)
+        
+        response = timed(times, 'predict_route', client.post, '/predict',
+                         data={'file': (io.BytesIO(data), 'bench.jpg')},
+                         content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {response.get_json()}")
+    
+    return {
+        'resolution': f"{width}x{height}",
+        'upload_bytes': int(np.mean([len(p) for p in payloads])),
+        'stages': {stage: summarize(samples) for stage, samples in stage_times.items()}
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=SERVICE_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline_path):
+    """Print p50/p99 deltas against a previous results file"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    base = {r['resolution']: r['stages'] for r in baseline['results']}
+    
+    print(f"\nComparison against {baseline.get('commit')} ({baseline_path})")
+    print(f"{'resolution':<12}{'stage':<18}{'p50 ms':>18}{'p99 ms':>18}")
+    for entry in current['results']:
+        for stage, stats in entry['stages'].items():
+            old = base.get(entry['resolution'], {}).get(stage)
+            if not old:
+                continue
+            p50 = f"{old['p50_ms']:.2f} -> {stats['p50_ms']:.2f}"
+            p99 = f"{old['p99_ms']:.2f} -> {stats['p99_ms']:.2f}"
+            print(f"{entry['resolution']:<12}{stage:<18}{p50:>18}{p99:>18}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for the BloomIQ YOLO service')
+    parser.add_argument('--model', choices=['stub', 'yolov8n'], default='stub')
+    parser.add_argument('--weights', default='yolov8n.pt', help='weights used for both models in yolov8n mode')
+    parser.add_argument('--resolutions', nargs='+', default=DEFAULT_RESOLUTIONS, help='WIDTHxHEIGHT')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--stub-boxes', type=int, default=20, help='detections returned by the stub model')
+    parser.add_argument('--stub-delay-ms', type=float, default=0.0, help='simulated forward-pass time')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>-<model>.json)')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    args = parser.parse_args()
+    
+    # Resolve paths before import_service() changes the working directory
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.compare).resolve() if args.compare else None
+    
+    app = import_service(stub=args.model == 'stub')
+    app.result_cache = None  # every request must reach the models
+    
+    if args.model == 'stub':
+        app.activate_version(app.ModelVersion(StubModel(args.stub_boxes, args.stub_delay_ms, seed=1),
+                                              StubModel(args.stub_boxes, args.stub_delay_ms, seed=2), 'stub'))
+        app.models_ready = True
+    else:
+        if not Path(args.weights).resolve().exists():
+            parser.error(f"{args.weights} not found; the benchmark runs offline, place the weights locally")
+        app.activate_version(app.ModelVersion(app.YOLO(args.weights), app.YOLO(args.weights), args.weights))
+        app.configure_torch_threads()
+        app.models_ready = True
+    
+    client = app.app.test_client()
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'model': args.model,
+        'config': {
+            'model_execution': app.MODEL_EXECUTION,
+            'inference_backend': app.INFERENCE_BACKEND,
+            'confidence_threshold': app.CONFIDENCE_THRESHOLD,
+            'iterations': args.iterations,
+            'stub_boxes': args.stub_boxes if args.model == 'stub' else None,
+            'stub_delay_ms': args.stub_delay_ms if args.model == 'stub' else None
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': []
+    }
+    
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split('x'))
+        print(f"⏱️ {resolution} ...")
+        entry = bench_resolution(app, client, width, height, args.iterations, args.warmup)
+        report['results'].append(entry)
+        
+        for stage, stats in entry['stages'].items():
+            print(f"   {stage:<18} p50 {stats['p50_ms']:>9.2f} ms   p95 {stats['p95_ms']:>9.2f} ms"
+                  f"   p99 {stats['p99_ms']:>9.2f} ms   {stats['throughput_per_s']:>9.1f}/s")
+    
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{report['commit']}-{args.model}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Results written to {output}")
+    
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+BloomIQ - INT8 quantization report for the local YOLO models
+
+Runs the flower and fruit models over a folder of local images once in FP32
+(the exported ONNX models) and once per INT8 mode (MODEL_QUANTIZATION), and
+reports how far the quantized models drift from FP32:
+
+- detection agreement: mAP@0.5 per model, taking the FP32 detections as
+  ground truth, plus precision and recall at the serving threshold
+- stage agreement: share of images whose Flower / Fruit / Vegetative
+  decision is unchanged
+- latency: p50/p95 per model forward pass and per image, and throughput
+- memory: RSS after loading and peak RSS after the run
+
+Each variant runs in its own fresh process, so load time and RSS are not
+skewed by the other variant's models. Results are written as JSON.
+
+Usage (from backend/python-service):
+    python benchmarks/quantization_report.py ../models/eval
+    python benchmarks/quantization_report.py ../models/eval --modes dynamic static --limit 200
+
+Static mode calibrates on QUANT_CALIBRATION_DIR; use a different folder from
+the evaluation images. Other settings (CONFIDENCE_THRESHOLD, INFERENCE_IMGSZ,
+TORCH_THREADS, ...) are read from the environment as for the service.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+MODELS = ('flower', 'fruit')
+
+
+def memory_mb(field):
+    """VmRSS / VmHWM of this process from /proc (Linux), in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def run_variant(mode, paths, warmup):
+    """
+    Load the models with MODEL_QUANTIZATION=mode and analyze every image one
+    at a time. Runs in a spawned process; returns per-image outputs and timings.
+    """
+    os.environ['INFERENCE_BACKEND'] = 'onnx'
+    os.environ['MODEL_QUANTIZATION'] = mode
+    os.environ['MODEL_EXECUTION'] = 'sequential'  # time each model on its own
+    os.environ['WARMUP_ENABLED'] = 'false'
+    sys.path.insert(0, str(SERVICE_DIR))
+    os.chdir(SERVICE_DIR)
+
+    import app
+
+    start_time = time.perf_counter()
+    if not app.load_models():
+        raise RuntimeError(f"Could not load the models with MODEL_QUANTIZATION={mode}")
+    load_seconds = time.perf_counter() - start_time
+    rss_loaded = memory_mb('VmRSS')
+
+    models = {'flower': app.flower_model, 'fruit': app.fruit_model}
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append(app.decode_image(f)[0])
+
+    for image in images[:warmup]:
+        for model in models.values():
+            model([image], conf=app.CONFIDENCE_THRESHOLD, verbose=False)
+
+    timings = {'flower': [], 'fruit': [], 'image': []}
+    outputs = []
+    for image in images:
+        processed = {}
+        image_start = time.perf_counter()
+        for name, model in models.items():
+            start = time.perf_counter()
+            result = model([image], conf=app.CONFIDENCE_THRESHOLD, verbose=False)[0]
+            timings[name].append(time.perf_counter() - start)
+            processed[name] = app.postprocess(result)
+        stage = app.summarize_stage(processed['flower'], processed['fruit'])['stage']
+        timings['image'].append(time.perf_counter() - image_start)
+
+        outputs.append({
+            'stage': stage,
+            **{name: {key: processed[name][key].tolist() for key in ('xyxy', 'conf', 'cls')}
+               for name in MODELS}
+        })
+
+    return {
+        'mode': mode,
+        'artifacts': dict(app.model_artifacts),
+        'load_seconds': round(load_seconds, 2),
+        'rss_loaded_mb': rss_loaded,
+        'rss_peak_mb': memory_mb('VmHWM'),
+        'timings': timings,
+        'outputs': outputs
+    }
+
+
+def box_iou(box, boxes):
+    """IoU of one xyxy box against an (N, 4) array"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = (box[2] - box[0]) * (box[3] - box[1]) + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(areas - inter, 1e-9)
+
+
+def average_precision(recall, precision):
+    """Area under the precision envelope, 101-point interpolated (COCO style)"""
+    envelope = np.maximum.accumulate(np.concatenate([precision, [0.0]])[::-1])[::-1]
+    points = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, points, side='left')
+    return float(np.mean([envelope[i] if i < len(recall) else 0.0 for i in indices]))
+
+
+def detection_agreement(reference, candidate, iou_threshold=0.5):
+    """
+    mAP@0.5 of one model's candidate detections against the reference
+    detections, which stand in for ground truth. Also precision and recall
+    of all candidate detections (those above the serving threshold).
+    """
+    classes = sorted({c for image in reference for c in image['cls']} |
+                     {c for image in candidate for c in image['cls']})
+    aps = []
+    matched_total = predicted_total = truth_total = 0
+
+    for cls in classes:
+        truth = [np.array([b for b, c in zip(image['xyxy'], image['cls']) if c == cls]).reshape(-1, 4)
+                 for image in reference]
+        predictions = sorted(
+            ((conf, index, box) for index, image in enumerate(candidate)
+             for box, conf, c in zip(image['xyxy'], image['conf'], image['cls']) if c == cls),
+            key=lambda item: -item[0]
+        )
+        truth_count = sum(len(t) for t in truth)
+        used = [np.zeros(len(t), dtype=bool) for t in truth]
+        hits = []
+        for _, index, box in predictions:
+            hit = False
+            if len(truth[index]):
+                ious = box_iou(np.array(box), truth[index])
+                ious[used[index]] = 0
+                best = int(ious.argmax())
+                if ious[best] >= iou_threshold:
+                    used[index][best] = True
+                    hit = True
+            hits.append(hit)
+
+        matched = int(sum(hits))
+        matched_total += matched
+        predicted_total += len(hits)
+        truth_total += truth_count
+        if truth_count == 0:
+            continue  # a class FP32 never detects has no AP, only false positives
+
+        true_positives = np.cumsum(hits, dtype=np.float64)
+        recall = true_positives / truth_count
+        precision = true_positives / np.arange(1, len(hits) + 1)
+        aps.append(average_precision(recall, precision) if hits else 0.0)
+
+    return {
+        'map50': round(float(np.mean(aps)), 4) if aps else None,
+        'precision': round(matched_total / predicted_total, 4) if predicted_total else None,
+        'recall': round(matched_total / truth_total, 4) if truth_total else None,
+        'detections': predicted_total,
+        'reference_detections': truth_total
+    }
+
+
+def latency(samples):
+    values = np.array(samples) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'throughput_per_s': round(1000.0 / float(values.mean()), 2) if values.mean() else 0
+    }
+
+
+def describe(run):
+    return {
+        'artifacts': run['artifacts'],
+        'load_seconds': run['load_seconds'],
+        'rss_loaded_mb': run['rss_loaded_mb'],
+        'rss_peak_mb': run['rss_peak_mb'],
+        'latency': {stage: latency(samples) for stage, samples in run['timings'].items()}
+    }
+
+
+def compare(baseline, run):
+    """Agreement of a quantized run with the FP32 run"""
+    stages = [(a['stage'], b['stage']) for a, b in zip(baseline['outputs'], run['outputs'])]
+    changed = {}
+    for before, after in stages:
+        if before != after:
+            key = f"{before} -> {after}"
+            changed[key] = changed.get(key, 0) + 1
+
+    fp32_p50 = baseline['timings']['image']
+    return {
+        **describe(run),
+        'detection_agreement': {
+            name: detection_agreement([o[name] for o in baseline['outputs']], [o[name] for o in run['outputs']])
+            for name in MODELS
+        },
+        'stage_agreement': round(sum(a == b for a, b in stages) / len(stages), 4),
+        'stage_changes': changed,
+        'speedup_p50': round(float(np.percentile(fp32_p50, 50) / np.percentile(run['timings']['image'], 50)), 2)
+    }
+
+
+def list_images(folder, limit):
+    paths = sorted(str(path) for path in Path(folder).resolve().rglob('*')
+                   if path.is_file() and path.suffix.lstrip('.').lower() in IMAGE_EXTENSIONS)
+    return paths[:limit] if limit else paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare INT8 quantized BloomIQ models with FP32')
+    parser.add_argument('images', help='folder of evaluation images (not the calibration set)')
+    parser.add_argument('--modes', nargs='+', choices=['dynamic', 'static'], default=['dynamic', 'static'])
+    parser.add_argument('--limit', type=int, default=0, help='use at most this many images')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed images before measuring')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/quantization-<time>.json)')
+    args = parser.parse_args()
+
+    paths = list_images(args.images, args.limit)
+    if not paths:
+        parser.error(f"No images found in {args.images}")
+    output = Path(args.output).resolve() if args.output else None
+
+    # spawn: every variant loads its models into a clean process
+    context = multiprocessing.get_context('spawn')
+    runs = {}
+    for mode in ['none'] + args.modes:
+        print(f"⏱️ {'fp32' if mode == 'none' else 'int8-' + mode} on {len(paths)} images ...")
+        with context.Pool(1) as pool:
+            runs[mode] = pool.apply(run_variant, (mode, paths, args.warmup))
+
+    baseline = runs.pop('none')
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'images': len(paths),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'fp32': describe(baseline),
+        'int8': {mode: compare(baseline, run) for mode, run in runs.items()}
+    }
+
+    print(f"\n{'variant':<14}{'flower mAP50':>14}{'fruit mAP50':>13}{'stage agree':>13}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'speedup':>9}{'RSS MB':>9}")
+    fp32 = report['fp32']
+    print(f"{'fp32':<14}{'1.0':>14}{'1.0':>13}{'1.0':>13}{fp32['latency']['image']['p50_ms']:>10.1f}"
+          f"{fp32['latency']['image']['p95_ms']:>10.1f}{'1.00x':>9}{fp32['rss_peak_mb'] or 0:>9.0f}")
+    for mode, entry in report['int8'].items():
+        agreement = entry['detection_agreement']
+        print(f"{'int8-' + mode:<14}{str(agreement['flower']['map50']):>14}{str(agreement['fruit']['map50']):>13}"
+              f"{entry['stage_agreement']:>13}{entry['latency']['image']['p50_ms']:>10.1f}"
+              f"{entry['latency']['image']['p95_ms']:>10.1f}{str(entry['speedup_p50']) + 'x':>9}"
+              f"{entry['rss_peak_mb'] or 0:>9.0f}")
+
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"quantization-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
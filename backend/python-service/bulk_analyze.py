@@ -0,0 +1,402 @@
+"""
+BloomIQ - Bulk offline analyzer for the local YOLO models
+
+Runs the same analysis as the /predict endpoint of app.py over a directory or
+manifest of images, without HTTP. A pool of worker processes loads the
+models once per worker and analyzes images in batches. Results are streamed
+to JSONL or Parquet as they complete.
+
+The output file doubles as the checkpoint. On restart, images that already
+have a result from the same model weights (same fingerprint) and the same
+mode are skipped. An interrupted run over an archive therefore only redoes
+unfinished work, and a run after a model update re-analyzes everything.
+Images that failed are retried on every resume, and their old error records
+are dropped first, so the output holds at most one error per image.
+
+A chunk that raises gets an error record for each of its images instead of
+stopping the run. If a worker process dies (e.g. killed for running out of
+memory) the pool is restarted and the chunks that were in flight are retried
+one at a time; a chunk that takes its worker down again is recorded as
+errors.
+
+Usage (from backend/python-service):
+    python bulk_analyze.py /data/survey-2024 --output survey-2024.jsonl
+    python bulk_analyze.py manifest.txt --output nightly.parquet --workers 8
+    python bulk_analyze.py /data/orchard --output orchard.jsonl --tiled
+
+Manifests are .txt (one path per line), .csv (a 'path' column, else the
+first column) or .jsonl ({"path": ...} per line). Relative paths resolve
+against the manifest's directory. Model settings (INFERENCE_BACKEND,
+CONFIDENCE_THRESHOLD, TILE_SIZE, ...) are read from the environment as for
+the service.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+# Set in each worker process by init_worker()
+engine = None
+worker_tiled = False
+
+
+def init_worker(tiled, threads):
+    """Load (and warm up) the models once per worker process"""
+    global engine, worker_tiled
+
+    # Parent handles Ctrl-C and shuts the pool down cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if threads:
+        os.environ.setdefault('TORCH_THREADS', str(threads))
+    # A run uses the weights it started with; the fingerprint was taken up front
+    os.environ['MODEL_WATCH_INTERVAL'] = '0'
+
+    import app
+    app.ensure_models_loaded()
+    engine = app
+    worker_tiled = tiled
+
+
+def analyze_chunk(paths):
+    """Analyze a list of image paths; unreadable files get an error record"""
+    analyzed_at = datetime.now(timezone.utc).isoformat()
+    records = [None] * len(paths)
+    images, infos, positions = [], [], []
+
+    for index, path in enumerate(paths):
+        try:
+            with open(path, 'rb') as f:
+                image, info = engine.decode_image(f, max_side=engine.TILE_MAX_SIDE if worker_tiled else None)
+            images.append(image)
+            infos.append(info)
+            positions.append(index)
+        except Exception as e:
+            records[index] = {'path': path, 'error': f'Could not decode image: {e}'}
+
+    if worker_tiled:
+        analyses = [engine.analyze_tiled(image) for image in images]
+    else:
+        analyses = engine.analyze_images(images) if images else []
+
+    for index, analysis, info in zip(positions, analyses, infos):
+        engine.attach_preprocessing(analysis, info)
+        records[index] = {'path': paths[index], **analysis}
+
+    for record in records:
+        record.update({
+            'model_fingerprint': engine.model_fingerprint,
+            'tiled': worker_tiled,
+            'analyzed_at': analyzed_at
+        })
+    return records
+
+
+def error_records(paths, error, fingerprint, tiled):
+    """Records for a chunk whose analysis failed as a whole"""
+    analyzed_at = datetime.now(timezone.utc).isoformat()
+    return [{'path': path, 'error': error, 'model_fingerprint': fingerprint, 'tiled': tiled,
+             'analyzed_at': analyzed_at} for path in paths]
+
+
+def list_images(source):
+    """Image paths from a directory (recursive) or a manifest file, sorted and de-duplicated"""
+    source = Path(source)
+    if source.is_dir():
+        paths = (path for path in source.rglob('*')
+                 if path.is_file() and path.suffix.lstrip('.').lower() in IMAGE_EXTENSIONS)
+        return sorted({str(path.resolve()) for path in paths})
+
+    base = source.resolve().parent
+    with open(source, newline='') as f:
+        if source.suffix == '.csv':
+            rows = list(csv.reader(f))
+            column = rows[0].index('path') if rows and 'path' in rows[0] else 0
+            entries = [row[column] for row in rows[1 if rows and 'path' in rows[0] else 0:] if row]
+        elif source.suffix == '.jsonl':
+            entries = [json.loads(line)['path'] for line in f if line.strip()]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    return sorted({str((base / entry).resolve()) for entry in entries})
+
+
+class JsonlWriter:
+    """Append-only JSON lines; every flushed line is a finished image"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._repair()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def _repair(self):
+        """Drop a partial last line left by a crash"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def done(self, fingerprint, tiled):
+        finished = set()
+        if not self.path.exists():
+            return finished
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('model_fingerprint') == fingerprint and record.get('tiled') == tiled \
+                        and 'error' not in record:
+                    finished.add(record['path'])
+        return finished
+
+    def drop_errors(self, fingerprint, tiled):
+        """Remove error records of this run's images, which are about to be retried"""
+        if self.path.stat().st_size == 0:
+            return
+        self.file.close()
+        tmp = self.path.with_suffix('.tmp')
+        with open(self.path, encoding='utf-8') as src, open(tmp, 'w', encoding='utf-8') as dst:
+            for line in src:
+                record = json.loads(line)
+                if not ('error' in record and record.get('model_fingerprint') == fingerprint
+                        and record.get('tiled') == tiled):
+                    dst.write(line)
+        os.replace(tmp, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps(record) + '\n')
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.checkpoint()
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    A directory of Parquet part files, one per checkpoint (Parquet files
+    cannot be appended to). Nested fields are stored as JSON strings.
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.buffer = []
+
+    def done(self, fingerprint, tiled):
+        import pyarrow.parquet as pq
+
+        finished = set()
+        for part in sorted(self.path.glob('part-*.parquet')):
+            table = pq.read_table(part, columns=['path', 'model_fingerprint', 'tiled', 'error'])
+            for row in table.to_pylist():
+                if row['model_fingerprint'] == fingerprint and row['tiled'] == tiled and not row['error']:
+                    finished.add(row['path'])
+        return finished
+
+    def drop_errors(self, fingerprint, tiled):
+        """Rewrite the parts holding error records of this run's images, which are about to be retried"""
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        for part in sorted(self.path.glob('part-*.parquet')):
+            table = pq.read_table(part)
+            retried = pc.and_(pc.and_(pc.is_valid(table['error']), pc.equal(table['model_fingerprint'], fingerprint)),
+                              pc.equal(table['tiled'], tiled))
+            if not pc.any(retried).as_py():
+                continue
+            kept = table.filter(pc.invert(retried))
+            if kept.num_rows:
+                tmp = part.with_suffix('.tmp')
+                pq.write_table(kept, tmp)
+                os.replace(tmp, part)
+            else:
+                part.unlink()
+
+    def write(self, records):
+        for record in records:
+            counts = record.get('detection_counts', {})
+            self.buffer.append({
+                'path': record['path'],
+                'stage': record.get('stage'),
+                'confidence': record.get('confidence'),
+                'flowers': counts.get('flowers'),
+                'fruits': counts.get('fruits'),
+                'health_summary': record.get('health_summary'),
+                'detections': json.dumps(record.get('detections', [])),
+                'preprocessing': json.dumps(record['preprocessing']) if 'preprocessing' in record else None,
+                'tiling': json.dumps(record['tiling']) if 'tiling' in record else None,
+                'error': record.get('error'),
+                'model_fingerprint': record['model_fingerprint'],
+                'tiled': record['tiled'],
+                'analyzed_at': record['analyzed_at']
+            })
+
+    def checkpoint(self):
+        if not self.buffer:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Explicit schema: a part where every image succeeded must still type 'error' as string
+        schema = pa.schema([
+            ('path', pa.string()), ('stage', pa.string()), ('confidence', pa.float64()),
+            ('flowers', pa.int64()), ('fruits', pa.int64()), ('health_summary', pa.string()),
+            ('detections', pa.string()), ('preprocessing', pa.string()), ('tiling', pa.string()),
+            ('error', pa.string()), ('model_fingerprint', pa.string()), ('tiled', pa.bool_()),
+            ('analyzed_at', pa.string())
+        ])
+        part = self.path / f"part-{time.time_ns()}.parquet"
+        tmp = part.with_suffix('.tmp')
+        pq.write_table(pa.Table.from_pylist(self.buffer, schema=schema), tmp)
+        os.replace(tmp, part)  # a part is either complete or absent
+        self.buffer = []
+
+    def close(self):
+        self.checkpoint()
+
+
+def open_writer(output, restart):
+    output = Path(output)
+    if restart and output.exists():
+        if output.is_dir():
+            for part in output.glob('part-*.parquet'):
+                part.unlink()
+        else:
+            output.unlink()
+    return ParquetWriter(output) if output.suffix == '.parquet' else JsonlWriter(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk offline analysis with the BloomIQ YOLO models')
+    parser.add_argument('source', help='image directory or manifest (.txt, .csv, .jsonl)')
+    parser.add_argument('--output', required=True, help='results file: .jsonl, or .parquet (a directory of parts)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='worker processes, each with its own copy of the models')
+    parser.add_argument('--chunk-size', type=int, default=int(os.getenv('PREDICT_BATCH_SIZE', 16)),
+                        help='images per task (one batched forward pass)')
+    parser.add_argument('--checkpoint-every', type=float, default=30.0, help='seconds between checkpoints')
+    parser.add_argument('--tiled', action='store_true', help='tiled inference for high-resolution images')
+    parser.add_argument('--restart', action='store_true', help='discard existing results instead of resuming')
+    args = parser.parse_args()
+
+    # Reads file identities only; the models load in the workers
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from app import current_model_fingerprint
+    fingerprint = current_model_fingerprint()
+
+    paths = list_images(args.source)
+    writer = open_writer(args.output, args.restart)
+    finished = writer.done(fingerprint, args.tiled)
+    writer.drop_errors(fingerprint, args.tiled)
+    todo = [path for path in paths if path not in finished]
+
+    print(f"🗂️ {len(paths)} images, {len(paths) - len(todo)} already done, {len(todo)} to analyze")
+    print(f"🔖 Model fingerprint: {fingerprint}")
+    if not todo:
+        writer.close()
+        return
+
+    workers = max(1, min(args.workers, (len(todo) + args.chunk_size - 1) // args.chunk_size))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = iter([todo[i:i + args.chunk_size] for i in range(0, len(todo), args.chunk_size)])
+
+    def start_pool():
+        # spawn: workers start clean instead of inheriting the parent's imports and threads
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=init_worker, initargs=(args.tiled, threads))
+
+    executor = start_pool()
+    start_time = last_checkpoint = time.time()
+    processed = failed = 0
+    in_flight = {}  # future -> (chunk, whether it ran alone as a suspect)
+    suspects = []   # chunks that were in flight when a worker died
+
+    def fill():
+        # Suspects run one at a time, so a chunk that kills its worker again is known for certain
+        if suspects:
+            if not in_flight:
+                chunk = suspects.pop(0)
+                in_flight[executor.submit(analyze_chunk, chunk)] = (chunk, True)
+            return
+        # Keep a bounded number of tasks queued so results stream out steadily
+        while len(in_flight) < workers * 2:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            in_flight[executor.submit(analyze_chunk, chunk)] = (chunk, False)
+
+    def finish(future):
+        nonlocal processed, failed
+        chunk, alone = in_flight.pop(future)
+        try:
+            records = future.result()
+        except BrokenProcessPool:
+            if not alone:
+                suspects.append(chunk)
+                return
+            records = error_records(chunk, 'Worker process died while analyzing this chunk', fingerprint, args.tiled)
+        except Exception as e:
+            records = error_records(chunk, f'Chunk failed: {e}', fingerprint, args.tiled)
+        writer.write(records)
+        processed += len(records)
+        failed += sum('error' in record for record in records)
+
+    try:
+        fill()
+        while in_flight:
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = any(isinstance(future.exception(), BrokenProcessPool) for future in completed)
+            if broken:
+                # A dead worker fails every task of the pool; settle them all, then start a fresh one
+                wait(in_flight)
+                completed = list(in_flight)
+            for future in completed:
+                finish(future)
+            if broken:
+                print(f"⚠️ A worker process died; restarting the pool and retrying {len(suspects)} chunks one at a time")
+                executor.shutdown(wait=True)
+                executor = start_pool()
+            fill()
+
+            if time.time() - last_checkpoint >= args.checkpoint_every:
+                writer.checkpoint()
+                last_checkpoint = time.time()
+                rate = processed / (last_checkpoint - start_time)
+                eta = (len(todo) - processed) / rate if rate else 0
+                print(f"💾 {processed}/{len(todo)} ({rate:.1f} img/s, ETA {eta / 60:.1f} min, {failed} failed)")
+
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrupted, saving finished results...")
+        executor.shutdown(wait=False, cancel_futures=True)
+    finally:
+        writer.close()
+        executor.shutdown(wait=True)
+
+    elapsed = time.time() - start_time
+    print(f"✅ {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} img/s), "
+          f"{failed} failed. Results in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
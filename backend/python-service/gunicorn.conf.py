@@ -0,0 +1,77 @@
+"""
+Gunicorn configuration for the local YOLO service (app.py)
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The weights are loaded once in the master, which also builds the predictors
+(the fused copy of the weights Ultralytics makes on the first call), and
+every worker is forked from it, so the model tensors are shared copy-on-write
+instead of duplicated per worker. Each worker then pins torch to its share of the cores and runs its own
+warmup before it starts accepting requests.
+
+With the ONNX and OpenVINO backends the export (and INT8 calibration) is done
+once before forking, and the workers only open their runtime sessions.
+"""
+
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))  # app.py serializes calls into each model
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+# app.py splits the cores between workers based on the same variable
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+
+# Workers publish their metrics here so /metrics can add them up
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"bloomiq-yolo-metrics-{os.getenv('PORT', 8000)}"))
+
+
+def on_starting(server):
+    # Counters left over from a previous run would be added to the new ones
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    import app
+
+    # ONNX Runtime and OpenVINO sessions are not fork-safe; with those
+    # backends each worker loads its own copy instead. Build the artifacts
+    # here first: workers would otherwise all export to the same files, and
+    # a long export or calibration in post_fork runs past the worker timeout.
+    # A spawned process does it, so the master never runs torch before forking.
+    if app.INFERENCE_BACKEND != 'pytorch':
+        server.log.info(f"Building {app.INFERENCE_BACKEND} model artifacts before forking workers")
+        builder = multiprocessing.get_context('spawn').Process(target=app.build_artifacts)
+        builder.start()
+        builder.join()
+        if builder.exitcode:
+            server.log.error(f"Building model artifacts failed (exit code {builder.exitcode})")
+        return
+
+    server.log.info("Loading models in master for copy-on-write sharing")
+    if app.load_models():
+        # Otherwise each worker's first predict call copies and fuses the weights
+        app.setup_predictors()
+
+    # Keep the collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+
+    app.configure_torch_threads()
+
+    # Warm up in the worker, after fork, so no runtime thread pools are inherited
+    try:
+        app.ensure_models_loaded()
+    except Exception as e:
+        server.log.error(f"Worker {worker.pid}: model load failed: {e}")
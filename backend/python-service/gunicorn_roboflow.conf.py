@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for the Roboflow service (roboflow_service.py)
+
+    gunicorn -c gunicorn_roboflow.conf.py roboflow_service:app
+
+Requests spend nearly all their time waiting on the Roboflow round-trip, so
+workers use gevent: each in-flight request is a greenlet parked on a socket
+rather than an OS thread. A few workers can then hold hundreds of remote
+inferences, while the pooled client keeps TLS connections warm and the
+service caps concurrent calls with ROBOFLOW_MAX_CONCURRENCY.
+
+The local YOLO fallback (ROBOFLOW_HEDGE_MODE) is the exception: its model
+load and CPU inference do not yield, so they block the worker's gevent hub
+and stall every other request on that worker until they finish.
+"""
+
+import glob
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('GEVENT_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Workers publish their metrics here so /metrics can add them up
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"bloomiq-roboflow-metrics-{os.getenv('PORT', 8000)}"))
+
+
+def on_starting(server):
+    # Counters left over from a previous run would be added to the new ones
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
@@ -0,0 +1,169 @@
+"""
+BloomIQ - Non-blocking structured logging shared by the Python services
+
+Request threads only put records on a bounded in-memory queue. A background
+QueueListener thread formats them (JSON lines or text) and writes them to
+stdout, so slow or contended stdout never stalls a request. When the queue is
+full, records are dropped and counted instead of blocking.
+
+Large objects are passed as `extra={'payload': obj}`. Only a sample of them
+(LOG_PAYLOAD_SAMPLE_RATE) is kept, truncated to LOG_PAYLOAD_MAX_CHARS.
+Any other `extra` keys become structured fields.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # json or text
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # records waiting for the writer
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))  # share of payloads kept
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', 2000))
+
+ROOT_LOGGER = 'bloomiq'
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and key != 'payload'}
+
+
+def _render_payload(payload):
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str, ensure_ascii=False)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = f"{text[:LOG_PAYLOAD_MAX_CHARS]}... (+{len(text) - LOG_PAYLOAD_MAX_CHARS} chars)"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **_fields(record)
+        }
+        if hasattr(record, 'payload'):
+            entry['payload'] = _render_payload(record.payload)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if hasattr(record, 'payload'):
+            line += f"\n    payload: {_render_payload(record.payload)}"
+        return line
+
+
+class PayloadSampler(logging.Filter):
+    """Keep large payloads on a sample of records only; the message always goes through"""
+
+    def filter(self, record):
+        if hasattr(record, 'payload') and random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+            del record.payload
+            record.payload_sampled_out = True
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records without formatting them and drop them when the queue is
+    full. Message interpolation and traceback rendering happen on the
+    listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_lock = threading.Lock()
+
+
+def _start_listener():
+    global _listener
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_handler.queue, stream)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """Install the queue handler on the 'bloomiq' logger and start the writer thread"""
+    global _handler
+
+    with _lock:
+        if _handler is not None:
+            return
+
+        _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(PayloadSampler())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_handler)
+        root.propagate = False
+
+        _start_listener()
+        atexit.register(_stop_listener)
+        # The writer thread does not survive fork (gunicorn workers); give
+        # each child its own queue and thread
+        os.register_at_fork(after_in_child=_start_listener)
+
+
+def get_logger(name):
+    """Logger under the shared 'bloomiq' hierarchy, configuring it on first use"""
+    configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def stats():
+    return {
+        'format': LOG_FORMAT,
+        'level': LOG_LEVEL,
+        'queued': _handler.queue.qsize() if _handler else 0,
+        'dropped': _handler.dropped if _handler else 0,
+        'payload_sample_rate': LOG_PAYLOAD_SAMPLE_RATE
+    }
@@ -0,0 +1,258 @@
+"""
+BloomIQ - Minimal Prometheus metrics shared by the Python services
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format. With METRICS_DIR set (the gunicorn configs set it), each
+process writes its values to a file there and /metrics adds up the files of
+all workers, so a scrape sees the same series whichever worker answers it.
+Without it values are kept per process.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, request
+
+METRICS_DIR = os.getenv('METRICS_DIR', '')  # Shared by the workers of one service; empty keeps metrics per process
+
+# Latency buckets in seconds, from sub-millisecond post-processing up to
+# multi-second remote calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, aggregate='sum'):
+        super().__init__(name, documentation)
+        # How the workers' values are combined: 'sum' or 'max'
+        self.aggregate = aggregate
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(series[0]), series[1], series[2])
+                        for key, series in self._series.items()]
+        
+        samples = []
+        for key, bucket_counts, count, total in snapshot:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                samples.append((f'{self.name}_bucket', key, bucket_count, [('le', repr(float(bound)))]))
+            samples.append((f'{self.name}_bucket', key, count, [('le', '+Inf')]))
+            samples.append((f'{self.name}_count', key, count))
+            samples.append((f'{self.name}_sum', key, total))
+        return samples
+
+
+class Registry:
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._metrics = []
+        self._flush_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def counter(self, name, documentation):
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name, documentation, aggregate='sum'):
+        return self._register(Gauge(name, documentation, aggregate))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, buckets))
+
+    def flush(self):
+        """Publish this process's values for the other workers' scrapes"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with self._flush_lock:
+            snapshot = {metric.name: metric.samples() for metric in self._metrics}
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(f'{path}.tmp', path)
+
+    def render(self):
+        lines = []
+        for metric, samples in self._collect():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample in samples:
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f'{name}{_format_labels(key, extra)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _collect(self):
+        if not self.directory:
+            return [(metric, metric.samples()) for metric in self._metrics]
+        
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append((_process_alive(path), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        
+        collected = []
+        for metric in self._metrics:
+            merged = {}
+            for alive, snapshot in snapshots:
+                # Counters and histograms of exited workers still count; their gauges do not
+                if metric.kind == 'gauge' and not alive:
+                    continue
+                for name, key, value, *extra in snapshot.get(metric.name, []):
+                    key = tuple(tuple(pair) for pair in key)
+                    extra = [tuple(pair) for pair in extra[0]] if extra else []
+                    series = (name, key, tuple(extra))
+                    if series not in merged:
+                        merged[series] = value
+                    elif getattr(metric, 'aggregate', 'sum') == 'max':
+                        merged[series] = max(merged[series], value)
+                    else:
+                        merged[series] += value
+            collected.append((metric, [(name, key, value, list(extra))
+                                       for (name, key, extra), value in merged.items()]))
+        return collected
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def _process_alive(path):
+    pid = int(os.path.basename(path).split('.')[0])
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def instrument_app(app, registry, prefix):
+    """
+    Track in-flight requests and error responses per endpoint, and serve the
+    registry at /metrics
+    """
+    in_flight = registry.gauge(f'{prefix}_requests_in_flight', 'Requests currently being handled')
+    requests_total = registry.counter(f'{prefix}_requests_total', 'Requests handled, by endpoint and status')
+    errors_total = registry.counter(f'{prefix}_request_errors_total', 'Responses with a 4xx/5xx status')
+    
+    def endpoint():
+        # Route template rather than raw path, so unknown URLs share one series
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+    
+    @app.before_request
+    def _start_request():
+        if request.path != '/metrics':
+            in_flight.inc(endpoint=endpoint())
+            registry.flush()
+    
+    @app.after_request
+    def _count_response(response):
+        if request.path != '/metrics':
+            requests_total.inc(endpoint=endpoint(), status=response.status_code)
+            if response.status_code >= 400:
+                errors_total.inc(endpoint=endpoint(), status=response.status_code)
+        return response
+    
+    @app.teardown_request
+    def _finish_request(exc):
+        if request.path != '/metrics':
+            in_flight.dec(endpoint=endpoint())
+            registry.flush()
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics endpoint"""
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
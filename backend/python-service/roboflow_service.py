@@ -5,11 +5,30 @@ Using Roboflow's Inference SDK for crop analysis
 
 from flask import Flask, request, jsonify
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
 import sys
 from pathlib import Path
 import time
+import base64
+import hashlib
+import json
+import random
+import sqlite3
+import shutil
+import threading
+import uuid
+import importlib.util
+from functools import lru_cache, partial
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import io
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageOps, UnidentifiedImageError
 from dotenv import load_dotenv
+from metrics import Registry, instrument_app
+import logs
 
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / '.env')
@@ -23,18 +42,516 @@ except ImportError:
     sys.exit(1)
 
 app = Flask(__name__)
+logger = logs.get_logger('roboflow')
+
+# Prometheus metrics, served at /metrics
+metrics_registry = Registry()
+instrument_app(app, metrics_registry, 'bloomiq_roboflow')
+STAGE_SECONDS = metrics_registry.histogram('bloomiq_roboflow_stage_seconds', 'Time spent per request stage')
+ENGINE_TOTAL = metrics_registry.counter('bloomiq_roboflow_engine_total', 'Answers by engine and hedging reason')
+REMOTE_CALLS_TOTAL = metrics_registry.counter('bloomiq_roboflow_remote_calls_total', 'Roboflow call attempts by outcome')
+BREAKER_OPEN = metrics_registry.gauge('bloomiq_roboflow_breaker_open', '1 while the Roboflow circuit breaker is open',
+                                      aggregate='max')
+UPLOAD_BYTES = metrics_registry.counter('bloomiq_roboflow_upload_bytes_total', 'Image bytes received and sent to Roboflow')
 
 # Configuration
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 UPLOAD_FOLDER = './temp_uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Reject oversized uploads while the body is streamed in, before buffering
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', 15)) * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
 # Roboflow Configuration
 ROBOFLOW_API_KEY = os.getenv('ROBOFLOW_API_KEY', 'nRWwVHvuqJPkPtV2WZoB')
 ROBOFLOW_WORKSPACE = os.getenv('ROBOFLOW_WORKSPACE', 'moh-s15o3')
 ROBOFLOW_WORKFLOW_ID = os.getenv('ROBOFLOW_WORKFLOW_ID', 'custom-workflow')
 ROBOFLOW_API_URL = os.getenv('ROBOFLOW_API_URL', 'https://serverless.roboflow.com')
 
+# 'pooled' talks to the workflow API over a shared keep-alive session,
+# 'sdk' uses InferenceHTTPClient (a fresh connection per call)
+ROBOFLOW_CLIENT_MODE = os.getenv('ROBOFLOW_CLIENT_MODE', 'pooled').lower()
+ROBOFLOW_MAX_CONCURRENCY = int(os.getenv('ROBOFLOW_MAX_CONCURRENCY', 32))  # in-flight calls to Roboflow
+ROBOFLOW_TIMEOUT = float(os.getenv('ROBOFLOW_TIMEOUT', 30))  # seconds per call
+
+# Resilience: retries, retry budget, circuit breaker and concurrency limiter
+ROBOFLOW_RETRIES = int(os.getenv('ROBOFLOW_RETRIES', 2))  # extra attempts per call
+ROBOFLOW_BACKOFF_BASE = float(os.getenv('ROBOFLOW_BACKOFF_BASE', 0.2))  # seconds, doubled per attempt
+ROBOFLOW_BACKOFF_MAX = float(os.getenv('ROBOFLOW_BACKOFF_MAX', 2.0))  # seconds
+ROBOFLOW_RETRY_RATIO = float(os.getenv('ROBOFLOW_RETRY_RATIO', 0.1))  # retries earned per call
+ROBOFLOW_RETRY_BUDGET = float(os.getenv('ROBOFLOW_RETRY_BUDGET', 10))  # max banked retries
+ROBOFLOW_BREAKER_FAILURES = int(os.getenv('ROBOFLOW_BREAKER_FAILURES', 5))  # consecutive failures to open
+ROBOFLOW_BREAKER_RESET = float(os.getenv('ROBOFLOW_BREAKER_RESET', 30))  # seconds open before a probe
+ROBOFLOW_QUEUE_TIMEOUT = float(os.getenv('ROBOFLOW_QUEUE_TIMEOUT', 1.0))  # seconds to wait for a call slot
+
+# Client-side compaction: the workflow resizes to its model input anyway, so
+# full-resolution uploads only cost bandwidth and upload time
+ROBOFLOW_COMPACT = os.getenv('ROBOFLOW_COMPACT', 'true').lower() == 'true'
+ROBOFLOW_INPUT_SIZE = int(os.getenv('ROBOFLOW_INPUT_SIZE', 640))  # longest side, px
+ROBOFLOW_JPEG_QUALITY = int(os.getenv('ROBOFLOW_JPEG_QUALITY', 85))
+
+# Responses leave out raw_result/all_detections unless 'full' or ?debug=true
+ROBOFLOW_RESPONSE_MODE = os.getenv('ROBOFLOW_RESPONSE_MODE', 'compact').lower()
+ROBOFLOW_DEBUG = os.getenv('ROBOFLOW_DEBUG', 'false').lower() == 'true'  # log raw workflow output
+
+# Latency budget for the remote call. 'fallback' answers from the local YOLO
+# models (app.py) once the deadline passes or the remote errors; 'race' also
+# keeps waiting on the remote and returns whichever engine finishes first
+ROBOFLOW_DEADLINE = float(os.getenv('ROBOFLOW_DEADLINE', 3.0))  # seconds
+ROBOFLOW_HEDGE_MODE = os.getenv('ROBOFLOW_HEDGE_MODE', 'fallback').lower()  # off, fallback or race
+LOCAL_MODEL_PATHS = ('../models/flower_model.pt', '../models/fruit_model.pt')  # trained weights app.py serves
+
+# Local persistent cache of parsed results, shared by all workers on the host
+ROBOFLOW_CACHE_PATH = os.getenv('ROBOFLOW_CACHE_PATH', './roboflow_cache.db')
+ROBOFLOW_CACHE_MAX_ENTRIES = int(os.getenv('ROBOFLOW_CACHE_MAX_ENTRIES', 10000))  # 0 disables the cache
+ROBOFLOW_CACHE_MAX_BYTES = int(os.getenv('ROBOFLOW_CACHE_MAX_MB', 256)) * 1024 * 1024
+ROBOFLOW_CACHE_TTL = float(os.getenv('ROBOFLOW_CACHE_TTL', 7 * 24 * 3600))  # seconds
+
+class PooledRoboflowClient:
+    """
+    Keep-alive client for the Roboflow workflow HTTP API with the same
+    run_workflow() interface as InferenceHTTPClient. All requests share one
+    session, so TLS is negotiated once per pooled connection instead of once
+    per call. Concurrency is capped by the caller (remote_slots), which
+    the connection pool is sized to match.
+    """
+
+    def __init__(self, api_url, api_key, max_concurrency, timeout):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def run_workflow(self, workspace_name, workflow_id, images, use_cache=True):
+        payload = {
+            'api_key': self.api_key,
+            'use_cache': use_cache,
+            'inputs': {name: self._encode_image(image) for name, image in images.items()}
+        }
+        url = f"{self.api_url}/{workspace_name}/workflows/{workflow_id}"
+        
+        with self._lock:
+            self.in_flight += 1
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        
+        response.raise_for_status()
+        return response.json()['outputs']
+
+    def stats(self):
+        return {
+            'mode': 'pooled',
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'timeout': self.timeout
+        }
+
+    @staticmethod
+    def _encode_image(image):
+        """Workflow image input from a URL, raw bytes or a file path"""
+        if isinstance(image, str) and image.startswith(('http://', 'https://')):
+            return {'type': 'url', 'value': image}
+        if isinstance(image, (bytes, bytearray)):
+            data = image
+        else:
+            with open(image, 'rb') as f:
+                data = f.read()
+        return {'type': 'base64', 'value': base64.b64encode(data).decode('ascii')}
+
+
+class InferenceCache:
+    """
+    Persistent SQLite cache of parsed Roboflow results, keyed on image content
+    plus workspace and workflow. Bounded by entry count and stored bytes with
+    least-recently-used eviction, and entries expire after a TTL. Triggers
+    keep the entry and byte totals in a one-row table, so every worker sharing
+    the file sees the same totals without scanning the results.
+    Identical requests that arrive while one is already running wait for that
+    call instead of making their own.
+    """
+
+    def __init__(self, path, max_entries, max_bytes, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+
+        # One transaction, so the totals of an existing cache file are counted exactly once
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            ''')
+            self._db.execute('INSERT OR IGNORE INTO totals SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM results')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS results_inserted AFTER INSERT ON results BEGIN
+                    UPDATE totals SET entries = entries + 1, size = size + new.size;
+                END
+            ''')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS results_resized AFTER UPDATE OF size ON results BEGIN
+                    UPDATE totals SET size = size - old.size + new.size;
+                END
+            ''')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS results_deleted AFTER DELETE ON results BEGIN
+                    UPDATE totals SET entries = entries - 1, size = size - old.size;
+                END
+            ''')
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def make_key(image_bytes):
+        digest = hashlib.sha256(image_bytes)
+        digest.update(f"|{ROBOFLOW_WORKSPACE}|{ROBOFLOW_WORKFLOW_ID}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT value, created FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] + self.ttl < now:
+                self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+                return None
+            self._db.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            # Workers sharing the file insert and evict one at a time
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                # An upsert, since the delete done by INSERT OR REPLACE skips the triggers
+                self._db.execute('''
+                    INSERT INTO results VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,
+                        created = excluded.created, accessed = excluded.accessed
+                ''', (key, value, len(value), now, now))
+                self._evict()
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def get_or_compute(self, key, compute, store_if=None):
+        """
+        Return (result, status) where status is 'hit', 'miss' or 'coalesced'.
+        Only one caller per key runs `compute`; the others share its outcome.
+        The result is persisted unless `store_if(result)` says otherwise.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, 'hit'
+        
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = Future()
+        
+        if not leader:
+            self.coalesced += 1
+            return pending.result(), 'coalesced'
+        
+        self.misses += 1
+        try:
+            result = compute()
+            if store_if is None or store_if(result):
+                self.put(key, result)
+            pending.set_result(result)
+            return result, 'miss'
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute('SELECT entries, size FROM totals').fetchone()
+        return {
+            'enabled': True,
+            'path': self.path,
+            'entries': entries,
+            'bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced
+        }
+
+    def _evict(self):
+        # Drop the least recently used entries until both bounds hold again.
+        # How many bytes' worth to drop is estimated from the mean entry size,
+        # then checked against the totals once more.
+        while True:
+            entries, size = self._db.execute('SELECT entries, size FROM totals').fetchone()
+            if entries == 0 or (entries <= self.max_entries and size <= self.max_bytes):
+                return
+            excess = max(entries - self.max_entries, 0)
+            if size > self.max_bytes:
+                excess = max(excess, -(-(size - self.max_bytes) * entries // size))
+            self._db.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)', (excess,))
+
+
+inference_cache = InferenceCache(
+    ROBOFLOW_CACHE_PATH, ROBOFLOW_CACHE_MAX_ENTRIES, ROBOFLOW_CACHE_MAX_BYTES, ROBOFLOW_CACHE_TTL
+) if ROBOFLOW_CACHE_MAX_ENTRIES > 0 else None
+
+
+class RoboflowUnavailable(Exception):
+    """Raised without calling Roboflow: the breaker is open or no call slot is free"""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(f"Roboflow unavailable ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. Then a single probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                remaining = self.opened_at + self.reset_timeout - time.time()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise RoboflowUnavailable('circuit_open', retry_after=remaining)
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._probing:
+                    self.rejected += 1
+                    raise RoboflowUnavailable('circuit_open', retry_after=self.reset_timeout)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info("✅ Roboflow circuit breaker closed")
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+        BREAKER_OPEN.set(0)
+
+    def release(self):
+        """End a call that did not tell whether Roboflow is healthy"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.time()
+                self.times_opened += 1
+                logger.warning("⚠️ Roboflow circuit breaker open for %ss after %d failures",
+                               self.reset_timeout, self.failures)
+        if self.state == 'open':
+            BREAKER_OPEN.set(1)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+            if self.state == 'open':
+                stats['retry_in'] = round(max(0, self.opened_at + self.reset_timeout - time.time()), 1)
+            return stats
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all calls: each call earns `ratio` of a retry and
+    each retry spends one, up to `max_tokens` banked. During an outage the
+    budget drains, so retries add at most ~ratio extra load on Roboflow.
+    """
+
+    def __init__(self, ratio, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {'tokens': round(self.tokens, 2), 'max_tokens': self.max_tokens,
+                    'ratio': self.ratio, 'exhausted': self.exhausted}
+
+
+breaker = CircuitBreaker(ROBOFLOW_BREAKER_FAILURES, ROBOFLOW_BREAKER_RESET)
+retry_budget = RetryBudget(ROBOFLOW_RETRY_RATIO, ROBOFLOW_RETRY_BUDGET)
+remote_slots = threading.BoundedSemaphore(ROBOFLOW_MAX_CONCURRENCY)
+
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def response_status(error):
+    """HTTP status Roboflow answered with, None when no response came back"""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', getattr(error, 'status_code', None))
+
+
+def is_retryable(error):
+    """
+    Only transient failures are retried: the connection failed or timed out,
+    or Roboflow answered 429/5xx. Client errors and local errors (a missing
+    file, a malformed response) will fail the same way again.
+    """
+    # The SDK client wraps connection errors in its own exception type
+    if isinstance(error, TRANSIENT_ERRORS) or isinstance(error.__cause__, TRANSIENT_ERRORS):
+        return True
+    status = response_status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def attempt_roboflow(image, use_cache):
+    """One workflow call holding a concurrency slot, gated by the breaker"""
+    if not remote_slots.acquire(timeout=ROBOFLOW_QUEUE_TIMEOUT):
+        REMOTE_CALLS_TOTAL.inc(outcome='shed')
+        raise RoboflowUnavailable('overloaded', retry_after=ROBOFLOW_QUEUE_TIMEOUT)
+    try:
+        try:
+            breaker.before_call()
+        except RoboflowUnavailable:
+            REMOTE_CALLS_TOTAL.inc(outcome='rejected')
+            raise
+        
+        try:
+            result = client.run_workflow(
+                workspace_name=ROBOFLOW_WORKSPACE,
+                workflow_id=ROBOFLOW_WORKFLOW_ID,
+                images={
+                    "image": image  # Compacted bytes or path to the uploaded image
+                },
+                use_cache=use_cache  # Speeds up repeated requests
+            )
+        except Exception as e:
+            # A client error still means Roboflow is up and answering; a
+            # local error says nothing about its health either way
+            if is_retryable(e):
+                breaker.record_failure()
+            elif response_status(e) is not None:
+                breaker.record_success()
+            else:
+                breaker.release()
+            REMOTE_CALLS_TOTAL.inc(outcome='error')
+            raise
+    finally:
+        remote_slots.release()
+    
+    breaker.record_success()
+    REMOTE_CALLS_TOTAL.inc(outcome='ok')
+    return result
+
+
+def call_roboflow(image, use_cache=True):
+    """
+    Run the workflow through the circuit breaker, with jittered exponential
+    backoff between attempts while the retry budget allows. At most
+    ROBOFLOW_MAX_CONCURRENCY calls run at once; callers that cannot get a
+    slot within ROBOFLOW_QUEUE_TIMEOUT are shed instead of queueing.
+    """
+    retry_budget.deposit()
+    attempt = 0
+    
+    while True:
+        try:
+            return attempt_roboflow(image, use_cache)
+        except RoboflowUnavailable:
+            raise
+        except Exception as e:
+            if not is_retryable(e) or attempt >= ROBOFLOW_RETRIES or breaker.state == 'open' \
+                    or not retry_budget.withdraw():
+                raise
+            
+            attempt += 1
+            delay = random.uniform(0, min(ROBOFLOW_BACKOFF_MAX, ROBOFLOW_BACKOFF_BASE * 2 ** attempt))
+            logger.warning("🔁 Roboflow attempt %d failed (%s), retrying in %.2fs", attempt, e, delay)
+            time.sleep(delay)
+
+
 # Initialize Roboflow client
 client = None
 
@@ -42,14 +559,22 @@ def init_roboflow_client():
     """Initialize Roboflow Inference Client"""
     global client
     try:
-        client = InferenceHTTPClient(
-            api_url=ROBOFLOW_API_URL,
-            api_key=ROBOFLOW_API_KEY
-        )
-        print("✅ Roboflow client initialized successfully")
+        if ROBOFLOW_CLIENT_MODE == 'pooled':
+            client = PooledRoboflowClient(
+                api_url=ROBOFLOW_API_URL,
+                api_key=ROBOFLOW_API_KEY,
+                max_concurrency=ROBOFLOW_MAX_CONCURRENCY,
+                timeout=ROBOFLOW_TIMEOUT
+            )
+        else:
+            client = InferenceHTTPClient(
+                api_url=ROBOFLOW_API_URL,
+                api_key=ROBOFLOW_API_KEY
+            )
+        logger.info("✅ Roboflow client initialized successfully (%s)", ROBOFLOW_CLIENT_MODE)
         return True
     except Exception as e:
-        print(f"❌ Failed to initialize Roboflow client: {e}")
+        logger.error("❌ Failed to initialize Roboflow client: %s", e)
         return False
 
 
@@ -58,7 +583,259 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def upload_path(filename, prefix=''):
+    """A temp path for an upload; unique, so same-named concurrent uploads never share a file"""
+    return os.path.join(UPLOAD_FOLDER, f"{prefix}{int(time.time())}_{uuid.uuid4().hex[:12]}_{secure_filename(filename)}")
+
+
+def pin_upload(path):
+    """
+    A second name for an upload file, removed by its own owner. A remote
+    call that outlives its request keeps reading the file after the request
+    has deleted its path.
+    """
+    pinned = f"{path}.{uuid.uuid4().hex[:8]}"
+    try:
+        os.link(path, pinned)
+    except OSError:
+        shutil.copyfile(path, pinned)
+    return pinned
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
 def analyze_with_roboflow(image_path):
+    """
+    Analyze an image, serving repeats from the local cache before paying
+    for a Roboflow round-trip
+    """
+    if inference_cache is None:
+        return hedged_analysis(image_path)
+    
+    with open(image_path, 'rb') as f:
+        key = InferenceCache.make_key(f.read())
+    
+    # Only remote answers are persisted; a fallback result is not a Roboflow result
+    result, status = inference_cache.get_or_compute(
+        key, lambda: hedged_analysis(image_path, key),
+        store_if=lambda r: r.get('model_version') == 'roboflow-v1'
+    )
+    return {**result, 'cache': status}
+
+
+# Local YOLO engine (app.py), imported on first fallback. None until then,
+# False once it is known to be unavailable
+local_engine = None
+local_engine_lock = threading.Lock()
+hedge_executor = None
+
+LOCAL_STAGE_NAMES = {'Flower': 'flowering', 'Fruit': 'fruiting', 'Vegetative': 'vegetative'}
+
+
+def local_fallback_possible():
+    """
+    Cheap check that a local answer could be given, without importing or
+    loading anything. The placeholder yolov8n weights are no fallback, so
+    both trained models must be on disk.
+    """
+    global local_engine
+    
+    if local_engine is None:
+        with local_engine_lock:
+            if local_engine is None:
+                if importlib.util.find_spec('ultralytics') is None:
+                    logger.warning("⚠️ Local fallback unavailable: ultralytics not installed")
+                    local_engine = False
+                elif not all(os.path.exists(path) for path in LOCAL_MODEL_PATHS):
+                    logger.warning("⚠️ Local fallback unavailable: trained weights missing (%s)",
+                                   ', '.join(LOCAL_MODEL_PATHS))
+                    local_engine = False
+    
+    return local_engine is not False
+
+
+def get_local_engine():
+    """
+    Import and load the local YOLO service on the first fallback. A failed
+    load disables the fallback instead of failing the request; None when
+    no local engine is available.
+    """
+    global local_engine
+    
+    if not local_fallback_possible():
+        return None
+    
+    with local_engine_lock:
+        if local_engine is None:
+            try:
+                import app as local_app
+                local_app.ensure_models_loaded()
+                local_engine = local_app
+                logger.info("✅ Local fallback models loaded")
+            except Exception as e:
+                logger.error("❌ Local fallback unavailable, models failed to load: %s", e)
+                local_engine = False
+    
+    return local_engine or None
+
+
+def get_hedge_executor():
+    global hedge_executor
+    if hedge_executor is None:
+        hedge_executor = ThreadPoolExecutor(max_workers=ROBOFLOW_MAX_CONCURRENCY * 2,
+                                            thread_name_prefix='hedge')
+    return hedge_executor
+
+
+def run_local_analysis(image_path, reason):
+    """Analyze with the local YOLO models, in the Roboflow response schema"""
+    engine = get_local_engine()
+    start_time = time.time()
+    
+    with STAGE_SECONDS.time(stage='local_inference'):
+        with open(image_path, 'rb') as f:
+            image, _ = engine.decode_image(f)
+        local = engine.analyze_image(image)
+    
+    stage = LOCAL_STAGE_NAMES.get(local['stage'], 'unknown')
+    counts = local['detection_counts']
+    response = {
+        'stage': stage,
+        'confidence': local['confidence'],
+        'detections': 0,
+        'flowering_results': {'confidence': 0, 'detections': 0},
+        'fruiting_results': {'confidence': 0, 'detections': 0},
+        'recommendations': local['recommendations'],
+        'processing_time': round(time.time() - start_time, 2),
+        'model_version': 'local-yolov8',
+        'fallback_reason': reason
+    }
+    
+    if stage == 'flowering':
+        response['detections'] = counts['flowers']
+        response['flowering_results'] = {'confidence': local['confidence'], 'detections': counts['flowers']}
+    elif stage == 'fruiting':
+        response['detections'] = counts['fruits']
+        response['fruiting_results'] = {'confidence': local['confidence'], 'detections': counts['fruits']}
+    
+    return response
+
+
+def store_late_result(key, future):
+    """Done-callback: cache a Roboflow answer that arrived after the deadline"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result.get('model_version') == 'roboflow-v1':
+        inference_cache.put(key, result)
+
+
+def hedged_analysis(image_path, cache_key=None):
+    """
+    Run the Roboflow workflow within the ROBOFLOW_DEADLINE budget. Past the
+    deadline, or when the remote errors, the local YOLO models answer
+    instead ('fallback') or race the still-running remote call ('race').
+    The engine that answered is recorded in `model_version`. A remote
+    answer that arrives too late is still cached under `cache_key`.
+    """
+    if ROBOFLOW_HEDGE_MODE == 'off' or not local_fallback_possible():
+        return run_roboflow_analysis(image_path)
+    
+    executor = get_hedge_executor()
+    remote_path = pin_upload(image_path)
+    remote = executor.submit(run_roboflow_analysis, remote_path)
+    remote.add_done_callback(lambda _: remove_file(remote_path))
+    
+    try:
+        result = remote.result(timeout=ROBOFLOW_DEADLINE)
+        ENGINE_TOTAL.inc(engine='roboflow', reason='ok')
+        return result
+    except FuturesTimeoutError:
+        reason = 'deadline'
+        if cache_key is not None and inference_cache is not None:
+            remote.add_done_callback(partial(store_late_result, cache_key))
+    except RoboflowUnavailable as e:
+        reason = e.reason
+    except Exception as e:
+        logger.warning("⚠️ Roboflow failed, using local models: %s", e)
+        reason = 'remote_error'
+    
+    # Loaded only now that it is needed; without it, the remote call has the last word
+    if get_local_engine() is None:
+        result = remote.result()
+        ENGINE_TOTAL.inc(engine='roboflow', reason=reason)
+        return result
+    
+    if ROBOFLOW_HEDGE_MODE != 'race' or reason != 'deadline':
+        ENGINE_TOTAL.inc(engine='local', reason=reason)
+        return run_local_analysis(image_path, reason)
+    
+    # Race the slow remote call against the local models
+    local = executor.submit(run_local_analysis, image_path, reason)
+    done, _ = wait([remote, local], return_when=FIRST_COMPLETED)
+    winner = done.pop()
+    other = local if winner is remote else remote
+    
+    try:
+        result = winner.result()
+    except Exception:
+        winner, result = other, other.result()
+    
+    ENGINE_TOTAL.inc(engine='roboflow' if winner is remote else 'local', reason=reason)
+    return result
+
+
+def carries_metadata(image):
+    """
+    True unless `image` is a plain JPEG: no EXIF (and so no rotation), ICC
+    profile, XMP or comment, only the JFIF header segment
+    """
+    if image.format != 'JPEG':
+        return True
+    return 'comment' in image.info or any(marker != 'APP0' for marker, _ in image.applist)
+
+
+def compact_image(data):
+    """
+    Shrink an upload to what the workflow actually looks at: EXIF rotation
+    applied, longest side capped at ROBOFLOW_INPUT_SIZE, re-encoded as a
+    metadata-free JPEG. A plain JPEG that already fits is sent as is when
+    re-encoding would not make it smaller.
+    Returns the bytes to send and size stats.
+    """
+    with STAGE_SECONDS.time(stage='compact'):
+        image = Image.open(io.BytesIO(data))
+        fits = max(image.size) <= ROBOFLOW_INPUT_SIZE and not carries_metadata(image)
+        # Let the JPEG decoder skip straight to a reduced scale
+        image.draft('RGB', (ROBOFLOW_INPUT_SIZE, ROBOFLOW_INPUT_SIZE))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((ROBOFLOW_INPUT_SIZE, ROBOFLOW_INPUT_SIZE), Image.LANCZOS)
+        
+        out = io.BytesIO()
+        image = image.convert('RGB')
+        image.info.clear()  # Pillow writes a source JPEG comment back out otherwise
+        image.save(out, format='JPEG', quality=ROBOFLOW_JPEG_QUALITY, optimize=True)
+        compacted = out.getvalue()
+        
+        reencoded = not fits or len(compacted) < len(data)
+        if not reencoded:
+            compacted = data
+    
+    return compacted, {
+        'original_bytes': len(data),
+        'sent_bytes': len(compacted),
+        'bytes_saved': len(data) - len(compacted),
+        'size': list(image.size),
+        'reencoded': reencoded
+    }
+
+
+def run_roboflow_analysis(image_path):
     """
     Run inference using Roboflow workflow
     """
@@ -68,29 +845,74 @@ def analyze_with_roboflow(image_path):
         if not init_roboflow_client():
             raise Exception("Roboflow client not initialized")
     
+    compact_path = None
     try:
         start_time = time.time()
         
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        
+        upload = None
+        image = image_path
+        if ROBOFLOW_COMPACT:
+            try:
+                data, upload = compact_image(data)
+            except (UnidentifiedImageError, OSError) as e:
+                logger.warning("⚠️ Could not compact image, sending original: %s", e)
+        
+        if upload is not None:
+            logger.debug("🗜️ Compacted upload: %d -> %d bytes", upload['original_bytes'], upload['sent_bytes'])
+            if isinstance(client, PooledRoboflowClient):
+                image = data
+            elif upload['reencoded']:
+                # The SDK client takes a path
+                compact_path = f"{image_path}.compact.jpg"
+                with open(compact_path, 'wb') as f:
+                    f.write(data)
+                image = compact_path
+        
+        UPLOAD_BYTES.inc(upload['original_bytes'] if upload else len(data), kind='received')
+        UPLOAD_BYTES.inc(len(data), kind='sent')
+        
         # Run workflow on the image
-        result = client.run_workflow(
-            workspace_name=ROBOFLOW_WORKSPACE,
-            workflow_id=ROBOFLOW_WORKFLOW_ID,
-            images={
-                "image": image_path  # Path to the uploaded image
-            },
-            use_cache=True  # Speeds up repeated requests
-        )
+        with STAGE_SECONDS.time(stage='roboflow_roundtrip'):
+            result = call_roboflow(image)
         
         processing_time = time.time() - start_time
         
         # Parse results from Roboflow
         # The structure depends on your workflow configuration
-        parsed_result = parse_roboflow_result(result, processing_time)
+        with STAGE_SECONDS.time(stage='postprocess'):
+            parsed_result = parse_roboflow_result(result, processing_time)
+        
+        if upload is not None:
+            parsed_result['upload'] = upload
         
         return parsed_result
         
+    except RoboflowUnavailable:
+        raise
     except Exception as e:
         raise Exception(f"Roboflow analysis error: {str(e)}")
+    finally:
+        if compact_path and os.path.exists(compact_path):
+            os.remove(compact_path)
+
+
+# Class-name keywords per category, checked in order (flower wins over fruit)
+CLASS_CATEGORY_KEYWORDS = (
+    ('flower', ('flower', 'bloom', 'blossom')),
+    ('fruit', ('fruit', 'berry', 'pod', 'apple', 'tomato')),
+)
+
+
+@lru_cache(maxsize=1024)
+def class_category(class_name):
+    """Map a lowercased class name to 'flower', 'fruit' or None, once per unique name"""
+    for category, keywords in CLASS_CATEGORY_KEYWORDS:
+        if any(keyword in class_name for keyword in keywords):
+            return category
+    return None
 
 
 def parse_roboflow_result(result, processing_time):
@@ -98,10 +920,8 @@ def parse_roboflow_result(result, processing_time):
     Parse Roboflow workflow result into BloomIQ format
     Handles the actual Roboflow workflow response structure
     """
-    
-    print("🔍 Raw Roboflow Result:")
-    print(result)
-    print("=" * 60)
+    if ROBOFLOW_DEBUG:
+        logger.info("🔍 Raw Roboflow result", extra={'payload': result})
     
     # Default response structure
     response = {
@@ -125,75 +945,40 @@ def parse_roboflow_result(result, processing_time):
     try:
         # Roboflow workflow returns a list of results
         if not isinstance(result, list) or len(result) == 0:
-            print("⚠️ Warning: Empty or invalid result from Roboflow")
+            logger.warning("⚠️ Empty or invalid result from Roboflow")
             response['recommendations'] = [
                 'No detections found in the image',
                 'Try uploading a clearer image of the plant'
             ]
             return response
         
+        # Predictions live under 'output' (common in Roboflow workflows)
+        # or at the top level of the workflow output
         workflow_output = result[0]
-        print(f"📊 Workflow output keys: {workflow_output.keys()}")
+        output_data = workflow_output['output'] if 'output' in workflow_output else workflow_output
+        predictions = output_data.get('predictions', []) if isinstance(output_data, dict) else []
         
-        flower_count = 0
-        fruit_count = 0
+        counts = {'flower': 0, 'fruit': 0, None: 0}
         max_confidence = 0
         all_detections = []
         
-        # Parse different possible output structures
-        # Check for 'output' key (common in Roboflow workflows)
-        if 'output' in workflow_output:
-            output_data = workflow_output['output']
-            print(f"📦 Output data type: {type(output_data)}")
+        for pred in predictions:
+            confidence = pred.get('confidence', 0)
+            class_name = pred.get('class', '').lower()
             
-            # If output contains predictions array
-            if isinstance(output_data, dict) and 'predictions' in output_data:
-                predictions = output_data['predictions']
-                print(f"🎯 Found {len(predictions)} predictions")
-                
-                for pred in predictions:
-                    confidence = pred.get('confidence', 0)
-                    class_name = pred.get('class', '').lower()
-                    
-                    all_detections.append({
-                        'class': class_name,
-                        'confidence': confidence
-                    })
-                    
-                    if confidence > max_confidence:
-                        max_confidence = confidence
-                    
-                    # Count flowers and fruits based on class names
-                    if 'flower' in class_name or 'bloom' in class_name or 'blossom' in class_name:
-                        flower_count += 1
-                    elif 'fruit' in class_name or 'berry' in class_name or 'pod' in class_name or 'apple' in class_name or 'tomato' in class_name:
-                        fruit_count += 1
-        
-        # Also check top-level predictions (alternative structure)
-        elif 'predictions' in workflow_output:
-            predictions = workflow_output['predictions']
-            print(f"🎯 Found {len(predictions)} predictions at top level")
+            all_detections.append({
+                'class': class_name,
+                'confidence': confidence
+            })
             
-            for pred in predictions:
-                confidence = pred.get('confidence', 0)
-                class_name = pred.get('class', '').lower()
-                
-                all_detections.append({
-                    'class': class_name,
-                    'confidence': confidence
-                })
-                
-                if confidence > max_confidence:
-                    max_confidence = confidence
-                
-                if 'flower' in class_name or 'bloom' in class_name or 'blossom' in class_name:
-                    flower_count += 1
-                elif 'fruit' in class_name or 'berry' in class_name or 'pod' in class_name or 'apple' in class_name or 'tomato' in class_name:
-                    fruit_count += 1
-        
-        print(f"🌸 Flowers detected: {flower_count}")
-        print(f"🍎 Fruits detected: {fruit_count}")
-        print(f"💯 Max confidence: {max_confidence}")
+            if confidence > max_confidence:
+                max_confidence = confidence
+            counts[class_category(class_name)] += 1
+        
+        flower_count = counts['flower']
+        fruit_count = counts['fruit']
+        logger.debug("🎯 %d predictions: %d flowers, %d fruits, max confidence %s",
+                     len(predictions), flower_count, fruit_count, max_confidence)
         
         # Determine stage based on detections
         total_detections = flower_count + fruit_count
@@ -241,12 +1026,9 @@ def parse_roboflow_result(result, processing_time):
         # Add detection details
         if all_detections:
             response['all_detections'] = all_detections
-            print(f"📝 All detections: {all_detections}")
         
     except Exception as e:
-        print(f"❌ Error parsing Roboflow result: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error parsing Roboflow result: %s", e, extra={'payload': result})
         
         response['recommendations'] = [
             'Analysis completed but results parsing failed',
@@ -257,6 +1039,37 @@ def parse_roboflow_result(result, processing_time):
     return response
 
 
+# Keys only returned when the caller asks for a debug response
+VERBOSE_RESPONSE_KEYS = ('raw_result', 'all_detections')
+
+
+def wants_debug_response():
+    """Full responses when ROBOFLOW_RESPONSE_MODE=full or the request passes ?debug=true"""
+    if ROBOFLOW_RESPONSE_MODE == 'full':
+        return True
+    return request.args.get('debug', '').lower() in ('1', 'true', 'yes')
+
+
+def compact_response(result):
+    """Drop the raw workflow output and per-detection list from a response"""
+    return {key: value for key, value in result.items() if key not in VERBOSE_RESPONSE_KEYS}
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    logger.info("❌ Upload rejected: larger than %d bytes", MAX_UPLOAD_BYTES)
+    return jsonify({'error': f'Upload too large. Maximum is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB'}), 413
+
+
+@app.errorhandler(RoboflowUnavailable)
+def roboflow_unavailable(e):
+    logger.warning("⚠️ %s", e)
+    response = jsonify({'error': str(e), 'reason': e.reason})
+    if e.retry_after:
+        response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+    return response, 503
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -265,6 +1078,22 @@ def health_check():
         'status': 'ok',
         'service': 'roboflow',
         'client_initialized': client_initialized,
+        'client': client.stats() if isinstance(client, PooledRoboflowClient) else {'mode': ROBOFLOW_CLIENT_MODE},
+        'cache': inference_cache.stats() if inference_cache else {'enabled': False},
+        'hedging': {
+            'mode': ROBOFLOW_HEDGE_MODE,
+            'deadline': ROBOFLOW_DEADLINE,
+            'local_engine': {None: 'not_loaded', False: 'unavailable'}.get(local_engine, 'loaded')
+        },
+        'logging': logs.stats(),
+        'resilience': {
+            'breaker': breaker.stats(),
+            'retry_budget': retry_budget.stats(),
+            'retries': ROBOFLOW_RETRIES,
+            'max_concurrency': ROBOFLOW_MAX_CONCURRENCY
+        },
+        'compaction': {'enabled': ROBOFLOW_COMPACT, 'input_size': ROBOFLOW_INPUT_SIZE,
+                       'jpeg_quality': ROBOFLOW_JPEG_QUALITY},
         'workspace': ROBOFLOW_WORKSPACE,
         'workflow_id': ROBOFLOW_WORKFLOW_ID,
         'api_url': ROBOFLOW_API_URL
@@ -277,71 +1106,64 @@ def predict():
     Main prediction endpoint
     Accepts image file and returns analysis using Roboflow
     """
-    print("\n" + "=" * 60)
-    print("📸 New prediction request received")
-    print("=" * 60)
+    start_time = time.perf_counter()
     
     try:
+        # Parsing the multipart body is where the upload is received
+        with STAGE_SECONDS.time(stage='upload_receive'):
+            files = request.files
+        
         # Check if file is in request
-        if 'file' not in request.files:
-            print("❌ No file in request")
+        if 'file' not in files:
+            logger.info("❌ No file in request")
             return jsonify({'error': 'No file provided'}), 400
         
-        file = request.files['file']
-        print(f"📁 File received: {file.filename}")
+        file = files['file']
         
         if file.filename == '':
-            print("❌ Empty filename")
+            logger.info("❌ Empty filename")
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            print(f"❌ Invalid file type: {file.filename}")
+            logger.info("❌ Invalid file type: %s", file.filename)
             return jsonify({'error': 'Invalid file type. Only PNG, JPG, JPEG allowed'}), 400
         
         # Save file temporarily
-        filename = secure_filename(file.filename)
-        timestamp = int(time.time())
-        filepath = os.path.join(UPLOAD_FOLDER, f"{timestamp}_{filename}")
+        filepath = upload_path(file.filename)
         file.save(filepath)
-        print(f"💾 File saved to: {filepath}")
-        print(f"📏 File size: {os.path.getsize(filepath)} bytes")
+        file_size = os.path.getsize(filepath)
+        logger.debug("💾 File saved to: %s", filepath, extra={'bytes': file_size})
         
         try:
             # Run analysis with Roboflow
-            print(f"🚀 Starting Roboflow analysis...")
             result = analyze_with_roboflow(filepath)
-            print(f"✅ Analysis complete!")
-            print(f"📊 Result: {result.get('stage', 'unknown')} stage detected")
-            print(f"🎯 Confidence: {result.get('confidence', 0)}")
-            print(f"🔢 Detections: {result.get('detections', 0)}")
-            
+        finally:
             # Clean up temporary file
             if os.path.exists(filepath):
                 os.remove(filepath)
-                print(f"🗑️ Cleaned up temporary file")
-            
-            print("=" * 60)
-            print("✅ Request completed successfully")
-            print("=" * 60 + "\n")
-            
-            return jsonify(result), 200
-            
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                print(f"🗑️ Cleaned up temporary file after error")
-            
-            print(f"❌ Analysis error: {e}")
-            import traceback
-            traceback.print_exc()
-            raise e
         
+        logger.info("✅ Prediction: %s stage", result.get('stage', 'unknown'), extra={
+            'confidence': result.get('confidence', 0),
+            'detections': result.get('detections', 0),
+            'engine': result.get('model_version'),
+            'cache': result.get('cache'),
+            'bytes': file_size,
+            'duration_ms': round((time.perf_counter() - start_time) * 1000, 1)
+        })
+        
+        if not wants_debug_response():
+            result = compact_response(result)
+        
+        with STAGE_SECONDS.time(stage='serialize'):
+            response = jsonify(result)
+        return response, 200
+        
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
+    except RoboflowUnavailable as e:
+        return roboflow_unavailable(e)
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
-        import traceback
-        traceback.print_exc()
-        print("=" * 60 + "\n")
+        logger.exception("❌ Prediction error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -382,9 +1204,7 @@ def test_workflow():
         # Check if it's a file upload or URL
         if 'file' in request.files:
             file = request.files['file']
-            filename = secure_filename(file.filename)
-            timestamp = int(time.time())
-            filepath = os.path.join(UPLOAD_FOLDER, f"test_{timestamp}_{filename}")
+            filepath = upload_path(file.filename, prefix='test_')
             file.save(filepath)
             image_source = filepath
         elif request.json and 'url' in request.json:
@@ -392,7 +1212,7 @@ def test_workflow():
         else:
             return jsonify({'error': 'No file or URL provided'}), 400
         
-        print(f"\n🧪 Testing workflow with: {image_source}")
+        logger.info("🧪 Testing workflow with: %s", image_source)
         
         # Test the workflow
         start_time = time.time()
@@ -410,9 +1230,7 @@ def test_workflow():
         if 'file' in request.files and os.path.exists(image_source):
             os.remove(image_source)
         
-        print(f"✅ Test complete in {processing_time:.2f}s")
-        print(f"📊 Raw result structure:")
-        print(result)
+        logger.info("✅ Test complete in %.2fs", processing_time, extra={'payload': result})
         
         return jsonify({
             'success': True,
@@ -422,10 +1240,10 @@ def test_workflow():
             'result_length': len(result) if isinstance(result, (list, dict)) else 0
         })
         
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
     except Exception as e:
-        print(f"❌ Test error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Test error: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -452,6 +1270,7 @@ if __name__ == '__main__':
     print("   - POST /predict      - Analyze image")
     print("   - GET  /workflow/info - Workflow details")
     print("   - GET  /test         - Test connection")
+    print("   - GET  /metrics      - Prometheus metrics")
     print("=" * 60)
     
     app.run(host='0.0.0.0', port=8000, debug=True)